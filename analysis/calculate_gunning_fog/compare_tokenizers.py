@@ -0,0 +1,68 @@
+# analysis/calculate_gunning_fog/compare_tokenizers.py
+"""
+Compares the 'regex' tokenizer backend with the NLTK reference backend on the
+given files (default: sample_text.txt): sentence, word and complex-word
+counts, the Gunning Fog score and the time each backend takes.
+
+Usage:
+    python compare_tokenizers.py [FILE ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+from utils import TOKENIZERS, calculate_gunning_fog, count_complex_words
+
+SAMPLE_FILE = Path(__file__).resolve().parent / 'sample_text.txt'
+
+
+def measure(tokenizer, text: str) -> dict:
+    """Runs one backend on the text and returns its counts, score and timing."""
+    start = time.perf_counter()
+    sentence_count, word_counts = tokenizer.count(text)
+    duration = time.perf_counter() - start
+    return {
+        'sentences': sentence_count,
+        'words': sum(word_counts.values()),
+        'complex': count_complex_words(word_counts),
+        'fog': calculate_gunning_fog(text, tokenizer),
+        'seconds': duration,
+    }
+
+
+def main():
+    paths = [Path(arg) for arg in sys.argv[1:]] or [SAMPLE_FILE]
+    backends = [TOKENIZERS['nltk'](), TOKENIZERS['regex']()]
+
+    try:
+        backends[0].count('Check.')
+    except ImportError:
+        print("NLTK is not installed. Run: pip install nltk")
+        sys.exit(1)
+    except LookupError:
+        print("NLTK's punkt data is missing. Run: python -m nltk.downloader punkt_tab")
+        sys.exit(1)
+
+    print(f"{'File':<22} {'Backend':<7} {'Sentences':>9} {'Words':>8} "
+          f"{'Complex':>8} {'Fog':>7} {'Time (ms)':>10}")
+    for path in paths:
+        try:
+            text = path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            print(f"Skipping missing file: {path}")
+            continue
+        results = {backend.name: measure(backend, text) for backend in backends}
+        for name, result in results.items():
+            print(f"{path.name:<22} {name:<7} {result['sentences']:>9,} "
+                  f"{result['words']:>8,} {result['complex']:>8,} "
+                  f"{result['fog']:>7.2f} {result['seconds'] * 1000:>10.1f}")
+        reference, fast = results['nltk'], results['regex']
+        print(f"{'':<22} {'diff':<7} {fast['sentences'] - reference['sentences']:>+9,} "
+              f"{fast['words'] - reference['words']:>+8,} "
+              f"{fast['complex'] - reference['complex']:>+8,} "
+              f"{fast['fog'] - reference['fog']:>+7.2f}")
+
+
+if __name__ == '__main__':
+    main()
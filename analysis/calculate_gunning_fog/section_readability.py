@@ -0,0 +1,225 @@
+# analysis/calculate_gunning_fog/section_readability.py
+"""
+Per-section readability: splits a markdown filing at its headings and
+calculates the Gunning Fog Index of every section.
+
+Scores are cached in a SQLite file keyed by a hash of the section text, so
+re-running over the same filings only scores sections that are new or have
+changed.
+
+Usage:
+    python section_readability.py filing.md [more.md ...] [--level 2]
+        [--cache readability_cache.db] [--top 10] [--tokenizer regex]
+"""
+
+import argparse
+import hashlib
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from utils import DEFAULT_TOKENIZER, SCORER_VERSION, TOKENIZERS, calculate_gunning_fog
+
+# ATX headings ("# Title" to "###### Title"), without trailing "#"s.
+_HEADING = re.compile(r'^(#{1,6})[ \t]+(.*?)(?:[ \t]+#+)?[ \t]*$')
+# Opening or closing line of a fenced code block.
+_FENCE = re.compile(r'^[ \t]*(```|~~~)')
+# Maximum number of hashes per SELECT ... IN (...) query.
+_LOOKUP_BATCH = 500
+
+DEFAULT_CACHE_PATH = 'readability_cache.db'
+
+
+def split_sections(markdown: str, max_level: int = 2) -> list:
+    """
+    Splits markdown at headings of level 1 to `max_level`.
+
+    Deeper headings stay inside their section. Text before the first heading
+    is returned as a section with an empty heading and level 0. Lines inside
+    fenced code blocks are never treated as headings.
+
+    Returns:
+        A list of dicts with 'heading', 'level' and 'text' (including the
+        heading line itself).
+    """
+    sections = []
+    heading, level, lines = '', 0, []
+    in_fence = False
+    for line in markdown.splitlines(keepends=True):
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else _HEADING.match(line.rstrip('\r\n'))
+        if match and len(match.group(1)) <= max_level:
+            if lines:
+                sections.append({'heading': heading, 'level': level, 'text': ''.join(lines)})
+            heading = match.group(2).strip('*_ \t')
+            level = len(match.group(1))
+            lines = []
+        lines.append(line)
+    if lines:
+        sections.append({'heading': heading, 'level': level, 'text': ''.join(lines)})
+    return sections
+
+
+def content_hash(text: str, tokenizer: str = DEFAULT_TOKENIZER) -> str:
+    """Cache key of a section: its text, the tokenizer and the scorer version."""
+    digest = hashlib.sha256(f'{SCORER_VERSION}\0{tokenizer}\0'.encode('utf-8'))
+    digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ReadabilityCache:
+    """
+    Persistent cache of section scores in a SQLite file, keyed by
+    content_hash(). `hits` and `misses` count the lookups since opening.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS section_scores ('
+            'hash TEXT PRIMARY KEY, score REAL NOT NULL, '
+            "created_at TEXT NOT NULL DEFAULT (datetime('now'))) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def get_many(self, hashes: list) -> dict:
+        """Returns {hash: score} for the hashes that are cached."""
+        unique = list(dict.fromkeys(hashes))
+        found = {}
+        for start in range(0, len(unique), _LOOKUP_BATCH):
+            batch = unique[start:start + _LOOKUP_BATCH]
+            placeholders = ', '.join('?' for _ in batch)
+            found.update(self._conn.execute(
+                f'SELECT hash, score FROM section_scores WHERE hash IN ({placeholders})',
+                batch,
+            ))
+        self.hits += sum(1 for h in hashes if h in found)
+        self.misses += sum(1 for h in hashes if h not in found)
+        return found
+
+    def put_many(self, scores: dict):
+        """Stores {hash: score} in one transaction."""
+        with self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO section_scores (hash, score) VALUES (?, ?)',
+                scores.items(),
+            )
+
+    def stats(self) -> dict:
+        """Returns the hit and miss counts and the number of cached sections."""
+        (size,) = self._conn.execute('SELECT COUNT(*) FROM section_scores').fetchone()
+        return {'hits': self.hits, 'misses': self.misses, 'entries': size}
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def score_sections(
+    markdown: str, cache=None, max_level: int = 2, tokenizer: str = DEFAULT_TOKENIZER
+) -> list:
+    """
+    Calculates the Gunning Fog Index of every section of a markdown document.
+
+    With a ReadabilityCache, sections whose text was scored before are read
+    from the cache and only new or changed sections are scored.
+
+    Returns:
+        The sections of split_sections() with 'words' (approximate, split on
+        whitespace), 'score' and 'cached' (whether the score came from the
+        cache) added, and 'text' removed.
+    """
+    sections = split_sections(markdown, max_level)
+    hashes = [content_hash(section['text'], tokenizer) for section in sections]
+    cached = cache.get_many(hashes) if cache is not None else {}
+
+    new_scores = {}
+    results = []
+    for section, key in zip(sections, hashes):
+        text = section.pop('text')
+        if key in cached:
+            score, from_cache = cached[key], True
+        else:
+            if key not in new_scores:
+                new_scores[key] = calculate_gunning_fog(text, tokenizer)
+            score, from_cache = new_scores[key], False
+        results.append({**section, 'words': len(text.split()), 'score': score, 'cached': from_cache})
+
+    if cache is not None and new_scores:
+        cache.put_many(new_scores)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Calculate the Gunning Fog Index of each section of markdown filings.',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument('files', nargs='+', type=Path, help='Markdown files to score.')
+    parser.add_argument(
+        '--level', type=int, default=2, choices=range(1, 7),
+        help='Split at headings of this level and above (1 = "#" only).',
+    )
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH, help='SQLite cache file.')
+    parser.add_argument('--no-cache', action='store_true', help='Do not read or write the cache.')
+    parser.add_argument(
+        '--top', type=int, default=10, help='Number of densest sections to show per file.'
+    )
+    parser.add_argument(
+        '--min-words', type=int, default=50,
+        help='Ignore sections with fewer words when listing the densest ones.',
+    )
+    parser.add_argument(
+        '--tokenizer', default=DEFAULT_TOKENIZER, choices=sorted(TOKENIZERS),
+        help="Tokenizer backend ('regex' is faster and needs no NLTK data).",
+    )
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else ReadabilityCache(args.cache)
+    start = time.perf_counter()
+    try:
+        for path in args.files:
+            try:
+                markdown = path.read_text(encoding='utf-8')
+            except OSError as e:
+                print(f'Could not read {path}: {e}', file=sys.stderr)
+                continue
+            sections = score_sections(markdown, cache, args.level, args.tokenizer)
+            densest = sorted(
+                (s for s in sections if s['words'] >= args.min_words),
+                key=lambda s: s['score'],
+                reverse=True,
+            )[:args.top]
+            print(f'\n--- {path.name}: {len(sections)} sections, densest first ---')
+            for section in densest:
+                if section['level']:
+                    heading = f"{'#' * section['level']} {section['heading']}"
+                else:
+                    heading = '(before the first heading)'
+                print(f"{section['score']:6.2f}  {section['words']:>7,} words  {heading[:70]}")
+        duration = time.perf_counter() - start
+        if cache is not None:
+            stats = cache.stats()
+            print(f"\nCache: {stats['hits']:,} hits, {stats['misses']:,} misses, "
+                  f"{stats['entries']:,} sections stored in {args.cache} ({duration:.2f} s)")
+    except sqlite3.Error as e:
+        print(f'Cache error ({args.cache}): {e}', file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,25 @@
 # analysis/calculate_gunning_fog/utils.py
 
+import os
 import re
-import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
-
-# --- Ensure NLTK data is available ---
-# The user will be prompted to download this in the notebook,
-# but having a fallback here is good practice.
-try:
-    nltk.data.find('tokenizers/punkt')
-except nltk.downloader.DownloadError:
-    print("NLTK 'punkt' tokenizer not found. Please run the setup in the accompanying notebook.")
-    # In a real library, you might trigger the download here, but for a cookbook,
-    # instructing the user is better.
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from pathlib import Path
+
+# NLTK is only needed for the "nltk" tokenizer backend and is imported the
+# first time that backend is used (see NltkTokenizer).
+
+# Maximum number of distinct words whose classification is remembered across
+# documents. Financial filings reuse a vocabulary of a few ten thousand words.
+COMPLEX_WORD_CACHE_SIZE = 100_000
+
+# Version of the scoring logic. Increase it when a change to the tokenizers or
+# to is_complex_word changes scores, so cached and stored scores are redone.
+SCORER_VERSION = 1
+
+_NON_ALPHA = re.compile(r'[^a-z]')
 
 def is_complex_word(word: str) -> bool:
     """
@@ -23,7 +30,7 @@ def is_complex_word(word: str) -> bool:
     word = word.lower()
 
     # 2. Remove non-alphabetic characters
-    word = re.sub(r'[^a-z]', '', word)
+    word = _NON_ALPHA.sub('', word)
     if not word:
         return False
 
@@ -48,29 +55,431 @@ def is_complex_word(word: str) -> bool:
     return syllable_count >= 3
 
 
-def calculate_gunning_fog(text: str) -> float:
+# Memoized version of is_complex_word with a bounded LRU cache.
+is_complex_word_cached = lru_cache(maxsize=COMPLEX_WORD_CACHE_SIZE)(is_complex_word)
+
+
+def count_complex_words(words) -> int:
+    """
+    Counts the complex words in a list of words (or a Counter of words).
+
+    Each distinct word is classified once (through the shared cache) and
+    weighted by how often it occurs, instead of classifying every token.
+    The result is the same as counting with is_complex_word word by word.
+    """
+    word_counts = words if isinstance(words, Counter) else Counter(words)
+    return sum(
+        count for word, count in word_counts.items() if is_complex_word_cached(word)
+    )
+
+
+# --- Tokenizer backends ---
+# A backend's count(text) returns (sentence_count, word_counts), where
+# word_counts is a Counter of the purely alphabetic words of the text.
+
+class NltkTokenizer:
+    """
+    Reference backend: NLTK's punkt sentence splitter and word tokenizer.
+    Tokenizes the text twice and needs the 'punkt' data
+    (nltk.download('punkt_tab')).
+    """
+    name = 'nltk'
+
+    def count(self, text: str):
+        from nltk.tokenize import sent_tokenize, word_tokenize
+
+        sentences = sent_tokenize(text)
+        word_counts = Counter(word for word in word_tokenize(text) if word.isalpha())
+        return len(sentences), word_counts
+
+
+# Characters that NLTK's word tokenizer splits words on (besides whitespace).
+_SEPARATORS = r"""\s:,;@#$%&*?!()\[\]{}<>"`“”«»'‘’"""
+# One token: a run of non-separator characters in which "." and "-" do not
+# repeat ("..." and "--" separate tokens), optionally with ASCII apostrophes
+# inside or at the end (possessives and contractions). Like NLTK, curly
+# apostrophes split words ("City’s" gives "City" and "s").
+_TOKEN_BODY = rf"(?:[^{_SEPARATORS}.\-]|\.(?!\.)|-(?!-))+"
+_TOKEN_PATTERN = re.compile(
+    rf"(?P<end>[?!]+)|(?P<token>{_TOKEN_BODY}(?:'{_TOKEN_BODY})*'?)"
+)
+# What may follow a sentence-final period: closing quotes/brackets, then space.
+_AFTER_SENTENCE_END = re.compile(r"""["'”’)\]]*(?:\s|$)""")
+# Possessive and contraction endings that NLTK splits off a word.
+_CONTRACTION = re.compile(r"(?i)(?:n't|'(?:s|m|d|re|ve|ll)|')$")
+# Words that NLTK splits in two, and the length of the first part.
+_SPLIT_WORDS = {'cannot': 3, 'gimme': 3, 'gonna': 3, 'gotta': 3, 'lemme': 3, 'wanna': 3}
+# Dotted abbreviations and initials such as "U.S" or "e.g" (final period removed).
+_DOTTED_ABBREVIATION = re.compile(r"^(?:[^\W\d_]\.)*[^\W\d_]$")
+# Words that are usually followed by a period without ending the sentence.
+ABBREVIATIONS = frozenset({
+    'mr', 'mrs', 'ms', 'dr', 'prof', 'sr', 'jr', 'st', 'inc', 'ltd', 'co',
+    'corp', 'plc', 'llc', 'no', 'nos', 'vs', 'etc', 'approx', 'dept', 'fig',
+    'figs', 'jan', 'feb', 'mar', 'apr', 'jun', 'jul', 'aug', 'sep', 'sept',
+    'oct', 'nov', 'dec', 'ca', 'cf', 'al', 'resp',
+})
+
+
+class RegexTokenizer:
+    """
+    Fast backend: one compiled regular expression scans the text once and
+    produces the sentence count and the word counts together. It follows the
+    rules of NLTK's tokenizers (which characters split words, which periods
+    end sentences) closely; see compare_tokenizers.py for the differences.
+    """
+    name = 'regex'
+
+    def count(self, text: str):
+        word_counts = Counter()
+        sentence_count, _ = self.scan(text, word_counts)
+        return sentence_count, word_counts
+
+    def scan(self, text: str, word_counts: Counter, in_sentence: bool = False):
+        """
+        Adds the words of `text` to `word_counts`.
+
+        Returns:
+            (sentences started in `text`, whether the text ends inside a
+            sentence). Passing the second value back in lets a caller scan a
+            document in pieces that are split at whitespace.
+        """
+        sentence_count = 0
+        for match in _TOKEN_PATTERN.finditer(text):
+            token = match.group('token')
+            if token is None:
+                # "?" or "!" ends the current sentence.
+                if not in_sentence:
+                    sentence_count += 1
+                in_sentence = False
+                continue
+
+            if not in_sentence:
+                sentence_count += 1
+                in_sentence = True
+
+            ends_sentence = False
+            if token.endswith('.'):
+                word = token[:-1]
+                if (
+                    _DOTTED_ABBREVIATION.match(word)
+                    or word.lower() in ABBREVIATIONS
+                    or not _AFTER_SENTENCE_END.match(text, match.end())
+                ):
+                    # Abbreviations keep their period, so NLTK drops them as
+                    # non-alphabetic tokens.
+                    continue
+                ends_sentence = True
+            else:
+                word = token
+
+            if not word.isalpha():
+                word = _CONTRACTION.sub('', word)
+            if word.isalpha():
+                split = _SPLIT_WORDS.get(word.lower())
+                if split:
+                    word_counts[word[:split]] += 1
+                    word_counts[word[split:]] += 1
+                else:
+                    word_counts[word] += 1
+            if ends_sentence:
+                in_sentence = False
+
+        return sentence_count, in_sentence
+
+
+TOKENIZERS = {backend.name: backend for backend in (RegexTokenizer, NltkTokenizer)}
+# NLTK stays the default, so scores match those computed before the regex
+# backend existed. Pass tokenizer='regex' to opt in to the faster backend.
+DEFAULT_TOKENIZER = 'nltk'
+
+
+def get_tokenizer(tokenizer=DEFAULT_TOKENIZER):
+    """Returns a tokenizer backend for a name in TOKENIZERS, or the object itself."""
+    if isinstance(tokenizer, str):
+        try:
+            return TOKENIZERS[tokenizer]()
+        except KeyError:
+            raise ValueError(
+                f"Unknown tokenizer '{tokenizer}'. Choose from: {', '.join(TOKENIZERS)}."
+            ) from None
+    return tokenizer
+
+
+def gunning_fog_from_counts(
+    sentence_count: int, word_count: int, complex_word_count: int
+) -> float:
+    """
+    Applies the Gunning Fog formula to sentence, word and complex-word counts.
+    Formula: 0.4 * ( (words / sentences) + 100 * (complex_words / words) )
+    """
+    if not sentence_count or not word_count:
+        return 0.0
+
+    # 1. Calculate average words per sentence
+    avg_words_per_sentence = word_count / sentence_count
+
+    # 2. Calculate percentage of complex words
+    percentage_complex_words = (complex_word_count / word_count) * 100
+
+    # 3. Apply the Gunning Fog formula
+    fog_index = 0.4 * (avg_words_per_sentence + percentage_complex_words)
+
+    return fog_index
+
+
+def calculate_gunning_fog(text: str, tokenizer=DEFAULT_TOKENIZER) -> float:
     """
     Calculates the Gunning Fog Index for a given text.
     Formula: 0.4 * ( (words / sentences) + 100 * (complex_words / words) )
+
+    `tokenizer` selects the backend that splits the text into sentences and
+    words: 'nltk' (default, reference) or 'regex' (fast single pass, no
+    NLTK data needed).
     """
     if not text.strip():
         return 0.0
 
-    # 1. Tokenize sentences and words
-    sentences = sent_tokenize(text)
-    words = [word for word in word_tokenize(text) if word.isalpha()]
+    # Count sentences, words and complex words, then apply the formula
+    sentence_count, word_counts = get_tokenizer(tokenizer).count(text)
+    return gunning_fog_from_counts(
+        sentence_count, sum(word_counts.values()), count_complex_words(word_counts)
+    )
 
-    if not sentences or not words:
-        return 0.0
 
-    # 2. Calculate average words per sentence
-    avg_words_per_sentence = len(words) / len(sentences)
+# Characters read at a time by GunningFogAccumulator.update_from_file.
+STREAM_CHUNK_SIZE = 1 << 20
+# Longest text without whitespace that GunningFogAccumulator holds back
+# before scanning it anyway.
+MAX_CARRY_CHARS = 1 << 16
+# Matches a chunk up to and including its last whitespace character.
+_UP_TO_LAST_SPACE = re.compile(r'.*\s', re.DOTALL)
 
-    # 3. Calculate percentage of complex words
-    complex_words = [word for word in words if is_complex_word(word)]
-    percentage_complex_words = (len(complex_words) / len(words)) * 100
 
-    # 4. Apply the Gunning Fog formula
-    fog_index = 0.4 * (avg_words_per_sentence + percentage_complex_words)
+class GunningFogAccumulator:
+    """
+    Calculates the Gunning Fog Index of a document fed in chunks, e.g. a
+    markdown file of hundreds of MB read piece by piece.
+
+    Only running counts are kept (sentences, words, complex words) plus the
+    text after the last whitespace of the previous chunk, so memory does not
+    grow with the document. Chunks may split anywhere, even inside a word or
+    between a period and the next sentence. The final score is the same as
+    calculate_gunning_fog(whole_text) with the 'regex' tokenizer, unless the
+    text has a run of more than MAX_CARRY_CHARS characters without whitespace
+    (e.g. an embedded base64 image). Such a run is scanned once it reaches
+    that length, so a token may be split in two there.
+
+    Example:
+        fog = GunningFogAccumulator()
+        with open('filing.md', encoding='utf-8') as f:
+            fog.update_from_file(f)
+        print(fog.score())
+    """
+
+    def __init__(self):
+        self.sentence_count = 0
+        self.word_count = 0
+        self.complex_word_count = 0
+        self._tokenizer = RegexTokenizer()
+        self._in_sentence = False
+        # Text after the last whitespace seen, which may continue in the next chunk.
+        self._carry = ''
+
+    def update(self, chunk: str):
+        """Adds the next piece of the document."""
+        # Scan up to and including the last whitespace character. Tokens never
+        # contain whitespace, so everything before it is complete.
+        match = _UP_TO_LAST_SPACE.match(chunk)
+        end = match.end() if match else 0
+        if end:
+            self._add(self._scan(self._carry + chunk[:end], self._in_sentence))
+            self._carry = chunk[end:]
+        else:
+            self._carry += chunk
+        if len(self._carry) > MAX_CARRY_CHARS:
+            # Don't hold back an unbounded run without whitespace.
+            self._add(self._scan(self._carry, self._in_sentence))
+            self._carry = ''
+
+    def update_from(self, chunks):
+        """Adds every chunk of an iterable of strings (e.g. a generator)."""
+        for chunk in chunks:
+            self.update(chunk)
+
+    def update_from_file(self, file, chunk_size: int = STREAM_CHUNK_SIZE):
+        """Reads a text file handle to the end in chunks of `chunk_size` characters."""
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            self.update(chunk)
+
+    def _scan(self, text: str, in_sentence: bool) -> tuple:
+        """Returns (sentences, words, complex words, in_sentence) for a piece of text."""
+        word_counts = Counter()
+        sentences_started, in_sentence = self._tokenizer.scan(
+            text, word_counts, in_sentence
+        )
+        return (
+            sentences_started,
+            sum(word_counts.values()),
+            count_complex_words(word_counts),
+            in_sentence,
+        )
+
+    def _add(self, counts: tuple):
+        sentences, words, complex_words, self._in_sentence = counts
+        self.sentence_count += sentences
+        self.word_count += words
+        self.complex_word_count += complex_words
+
+    def score(self) -> float:
+        """
+        Returns the Gunning Fog Index of everything added so far, treating the
+        end of the last chunk as the end of the document. More chunks can
+        still be added afterwards.
+        """
+        sentences, words, complex_words, _ = self._scan(self._carry, self._in_sentence)
+        return gunning_fog_from_counts(
+            self.sentence_count + sentences,
+            self.word_count + words,
+            self.complex_word_count + complex_words,
+        )
+
+
+# --- Batch scoring ---
+# Items scored per task sent to a worker process. Larger chunks reduce the
+# inter-process overhead for many small documents.
+BATCH_CHUNK_SIZE = 16
+# Tasks queued per worker, so workers never wait for the next chunk while the
+# input iterable is only consumed as fast as results come back.
+TASKS_PER_WORKER = 2
+
+
+def _named_item(item):
+    """
+    Returns (name, path or None, text or None) for an input item. An item
+    that is neither a path nor a (name, text) pair gets its repr as the name
+    and a TypeError as the text, which _score_chunk reports as its result.
+    """
+    if isinstance(item, os.PathLike):
+        return str(item), item, None
+    # A bare string could be a text or a file name, so neither is guessed.
+    if not isinstance(item, (str, bytes)):
+        try:
+            name, text = item
+        except (TypeError, ValueError):
+            pass
+        else:
+            return name, None, text
+    return repr(item), None, TypeError(
+        f"Cannot score {repr(item)[:40]}: pass a file as a pathlib.Path "
+        "and a text as a (name, text) tuple."
+    )
+
+
+def _score_chunk(chunk, tokenizer):
+    """Worker: scores a list of (name, path, text) items, one result per item."""
+    results = []
+    for name, path, text in chunk:
+        if isinstance(text, TypeError):
+            results.append((name, text))
+            continue
+        try:
+            if path is not None and tokenizer == 'regex':
+                # Stream the file, so huge filings don't have to fit in memory.
+                accumulator = GunningFogAccumulator()
+                with open(path, 'r', encoding='utf-8') as f:
+                    accumulator.update_from_file(f)
+                results.append((name, accumulator.score()))
+                continue
+            if path is not None:
+                text = Path(path).read_text(encoding='utf-8')
+            results.append((name, calculate_gunning_fog(text, tokenizer)))
+        except Exception as e:
+            results.append((name, e))
+    return results
+
+
+def calculate_gunning_fog_many(
+    items, tokenizer=DEFAULT_TOKENIZER, max_workers=None, chunk_size=BATCH_CHUNK_SIZE
+):
+    """
+    Calculates the Gunning Fog Index of many documents in a process pool.
+
+    `items` is an iterable of:
+      * paths (pathlib.Path or other os.PathLike): the file is read in the
+        worker and its path is used as the name. With tokenizer='regex' the
+        file is streamed instead of read whole,
+      * (name, text) tuples.
+    Any other item, including a plain string (which could be meant as
+    either), gets a TypeError as its score.
+
+    Items are sent to the workers in chunks of `chunk_size`, and only a few
+    chunks per worker are in flight at a time, so `items` can be a generator
+    over a large corpus. `max_workers` defaults to the number of CPUs; with
+    max_workers=1 everything runs in the current process.
+
+    Yields:
+        (name, score) tuples in the order they complete. If an item fails
+        (e.g. its file is missing, or the worker scoring it crashed), score
+        is the exception instead of a float and the other items are still
+        scored.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    chunks = _chunked((_named_item(item) for item in items), chunk_size)
+
+    if max_workers == 1:
+        for chunk in chunks:
+            yield from _score_chunk(chunk, tokenizer)
+        return
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+        for chunk in chunks:
+            try:
+                future = executor.submit(_score_chunk, chunk, tokenizer)
+            except BrokenProcessPool as e:
+                # A worker died; the pool accepts no more tasks.
+                yield from _chunk_failed(chunk, e)
+                continue
+            pending[future] = chunk
+            if len(pending) >= max_workers * TASKS_PER_WORKER:
+                yield from _completed_results(pending)
+        while pending:
+            yield from _completed_results(pending)
+
+
+def _completed_results(pending: dict):
+    """
+    Waits for at least one of the `pending` {future: chunk} tasks, removes the
+    finished ones and yields their results. If a task failed as a whole (its
+    worker crashed, or a result could not be pickled), each item of its chunk
+    gets the exception as its score.
+    """
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    for future in done:
+        chunk = pending.pop(future)
+        try:
+            results = future.result()
+        except Exception as e:
+            results = _chunk_failed(chunk, e)
+        yield from results
+
+
+def _chunk_failed(chunk, error):
+    """Yields (name, error) for each item of a chunk."""
+    for name, _, _ in chunk:
+        yield name, error
+
 
-    return fog_index
\ No newline at end of file
+def _chunked(iterable, size):
+    """Yields lists of up to `size` consecutive items."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
@@ -0,0 +1,67 @@
+# analysis/count_keywords/benchmark_keywords.py
+"""
+Compares the regex alternation with KeywordMatcher as the watchlist grows.
+
+Watchlists are built from words and two-word phrases of the text, so most
+keywords actually occur. For each size, the script checks that both methods
+return the same counts and prints the time to build the matcher and to
+count the keywords in the text.
+
+Usage:
+    python benchmark_keywords.py [FILE] [--sizes 10 100 1000 5000]
+"""
+
+import argparse
+import random
+import re
+import time
+
+from keyword_counter import KeywordMatcher, regex_count_keywords
+
+
+def build_watchlist(text: str, size: int, seed: int = 0) -> list:
+    """Picks `size` distinct words and two-word phrases from the text."""
+    words = re.findall(r'[A-Za-z][A-Za-z-]+', text)
+    candidates = sorted(
+        {w.lower() for w in words} | {f'{a} {b}'.lower() for a, b in zip(words, words[1:])}
+    )
+    random.Random(seed).shuffle(candidates)
+    return candidates[:size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('file', nargs='?', default='sample_report.md', help='Text to search.')
+    parser.add_argument(
+        '--sizes', nargs='+', type=int, default=[10, 100, 1000, 5000],
+        help='Watchlist sizes to test.',
+    )
+    args = parser.parse_args()
+
+    with open(args.file, 'r', encoding='utf-8') as f:
+        text = f.read()
+    print(f"{args.file}: {len(text):,} characters")
+    print(f"{'Keywords':>8} {'Regex (s)':>10} {'Build (s)':>10} {'Count (s)':>10} "
+          f"{'Speed-up':>9}  Same counts")
+
+    for size in args.sizes:
+        keywords = build_watchlist(text, size)
+
+        start = time.perf_counter()
+        expected = regex_count_keywords(text, keywords)
+        regex_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matcher = KeywordMatcher(keywords)
+        build_time = time.perf_counter() - start
+        start = time.perf_counter()
+        counts = matcher.count(text)
+        count_time = time.perf_counter() - start
+
+        print(f"{len(keywords):>8,} {regex_time:>10.3f} {build_time:>10.3f} "
+              f"{count_time:>10.3f} {regex_time / count_time:>8.1f}x  "
+              f"{'yes' if counts == expected else 'NO'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+# analysis/count_keywords/keyword_counter.py
+
+import re
+from collections import Counter
+
+
+def regex_count_keywords(text, keywords):
+    """
+    Counts occurrences of a list of keywords in a given text, case-insensitively,
+    with one big regex alternation. This is the original implementation of the
+    notebook, kept as the reference for KeywordMatcher. It gets slow with
+    thousands of keywords, because every alternative is tried at every position.
+    """
+    # Create a single regex pattern: \b(word1|word2|...)\b for whole-word matching
+    # The `re.IGNORECASE` flag handles case-insensitivity.
+    pattern = r'\b(' + '|'.join(re.escape(k) for k in keywords) + r')\b'
+
+    # Find all non-overlapping matches in the string
+    matches = re.findall(pattern, text, re.IGNORECASE)
+
+    # Count the occurrences of each match, standardized to lowercase so 'Risk'
+    # and 'risk' are counted together
+    counts = Counter(match.lower() for match in matches)
+
+    # Ensure all original keywords are in the final result, even if their count is 0
+    return {kw.lower(): counts.get(kw.lower(), 0) for kw in keywords}
+
+
+def _is_word_char(char: str) -> bool:
+    """True for the characters matched by the regex class \\w."""
+    return char.isalnum() or char == '_'
+
+
+def _lower_same_length(text: str) -> str:
+    """Lowercases text, keeping characters whose lowercase form is longer (e.g. 'İ')."""
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return ''.join(c.lower() if len(c.lower()) == 1 else c for c in text)
+
+
+class KeywordMatcher:
+    """
+    Counts whole-word, case-insensitive occurrences of many keywords and
+    phrases in one pass over the text, with an Aho-Corasick automaton.
+
+    The automaton is built once from the keyword list and can be reused for
+    any number of documents. The time to scan a text hardly depends on the
+    number of keywords, unlike a regex alternation.
+
+    The counts are the same as regex_count_keywords: a match must start and
+    end at a word boundary (\\b), matches do not overlap, and where several
+    keywords match at the same position the first one in the list wins, as
+    it does in the regex.
+
+    Example:
+        matcher = KeywordMatcher(['ESG', 'supply chain', 'risk'])
+        for text in documents:
+            print(matcher.count(text))
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        # Trie: goto[state] maps a character to the next state. State 0 is the root.
+        self._goto = [{}]
+        # For each state, (priority, length) of the keyword ending there, if any.
+        self._terminal = [None]
+        for priority, keyword in enumerate(self.keywords):
+            pattern = _lower_same_length(keyword)
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._terminal.append(None)
+                state = next_state
+            # With duplicate keywords, the first one keeps its priority.
+            if self._terminal[state] is None:
+                self._terminal[state] = (priority, len(pattern))
+        self._build_failure_links()
+        # Transitions of the finished automaton, filled in lazily while
+        # scanning: _delta[state][char] -> next state.
+        self._delta = [dict(edges) for edges in self._goto]
+
+    def _build_failure_links(self):
+        """
+        Computes, breadth-first, the failure link of every state (the longest
+        proper suffix that is also a trie path) and the keywords ending at
+        each state, including those reached through failure links.
+        """
+        self._fail = [0] * len(self._goto)
+        self._outputs = [[terminal] if terminal else [] for terminal in self._terminal]
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for char, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._outputs[child] = self._outputs[child] + self._outputs[self._fail[child]]
+                queue.append(child)
+
+    def _step(self, state: int, char: str) -> int:
+        """Follows failure links to find (and cache) the transition on `char`."""
+        fallback = state
+        while fallback and char not in self._goto[fallback]:
+            fallback = self._fail[fallback]
+        next_state = self._goto[fallback].get(char, 0)
+        self._delta[state][char] = next_state
+        return next_state
+
+    def finditer(self, text: str):
+        """
+        Yields (start, end, keyword) for each match, from left to right, with
+        the same selection rules as the regex alternation.
+        """
+        lowered = _lower_same_length(text)
+        delta, outputs, step = self._delta, self._outputs, self._step
+        text_length = len(text)
+
+        # Best (lowest priority number) match starting at each position.
+        best = {}
+        state = 0
+        for end, char in enumerate(lowered, start=1):
+            next_state = delta[state].get(char)
+            state = step(state, char) if next_state is None else next_state
+            if not outputs[state]:
+                continue
+            # \b at the end of the match
+            after_is_word = end < text_length and _is_word_char(text[end])
+            before_end_is_word = _is_word_char(text[end - 1])
+            if before_end_is_word == after_is_word:
+                continue
+            for priority, length in outputs[state]:
+                start = end - length
+                # \b at the start of the match
+                before_is_word = start > 0 and _is_word_char(text[start - 1])
+                if before_is_word == _is_word_char(text[start]):
+                    continue
+                current = best.get(start)
+                if current is None or priority < current[0]:
+                    best[start] = (priority, end)
+
+        # Resolve overlaps like the regex: leftmost match first, then continue
+        # after its end.
+        position = 0
+        for start in sorted(best):
+            if start < position:
+                continue
+            priority, end = best[start]
+            yield start, end, self.keywords[priority]
+            position = end
+
+    def count(self, text: str) -> dict:
+        """
+        Returns {keyword.lower(): count} for every keyword, including those
+        with a count of 0.
+        """
+        counts = Counter(keyword.lower() for _, _, keyword in self.finditer(text))
+        return {kw.lower(): counts.get(kw.lower(), 0) for kw in self.keywords}
+
+
+def count_keywords(text, keywords):
+    """
+    Counts occurrences of a list of keywords in a given text, case-insensitively.
+    Same result as regex_count_keywords. To count the same keywords in many
+    texts, build a KeywordMatcher once and call its count method instead.
+    """
+    return KeywordMatcher(keywords).count(text)
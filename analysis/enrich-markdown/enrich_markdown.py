@@ -1,15 +1,239 @@
 import os
+import re
 import sys
 import argparse
+import asyncio
 import time
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
 
+# Shared LLM response cache from the repository's common/ directory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+from llm_cache import DEFAULT_CACHE_PATH, CachedClient, LLMResponseCache
+
 # --- Configuration ---
 # We use Gemini 2.5 Flash for its balance of speed, cost, and massive context window.
 MODEL_ID = "gemini-2.5-flash"
 
+SYSTEM_INSTRUCTION = """
+    You are an expert financial document formatter. 
+    Your task is to take the provided raw text (which is a 10-K filing converted from HTML/PDF) and format it into perfect, readable Markdown.
+    
+    Rules:
+    1. Do NOT summarize. Do NOT omit any text. Keep the content exactly as is.
+    2. Format financial tables using Markdown tables. Ensure headers align correctly.
+    3. Use proper # H1, ## H2, ### H3 tags for headers based on the document structure.
+    4. Fix broken line breaks inside paragraphs.
+    5. Return ONLY the markdown.
+    """
+
+# Added to the instruction in chunked mode, where each request sees one part.
+CHUNK_INSTRUCTION = """
+    6. The text is one part of a longer document, split at a section, page or table boundary.
+       Format only this part. Do not add a title, an introduction or closing remarks, and do not
+       complete sections, sentences or tables that continue beyond it.
+    """
+
+# --- Chunked mode configuration ---
+# Target size of a chunk. Smaller chunks finish faster but see less context.
+CHUNK_CHARS = 30_000
+# Chunks are cut at the strongest boundary in their last half, so they are
+# never smaller than this fraction of CHUNK_CHARS (except the last one).
+MIN_CHUNK_FRACTION = 0.5
+# Attempts per chunk before the run fails, with exponential backoff.
+MAX_ATTEMPTS = 3
+
+HEADING_RE = re.compile(r"^#{1,6}\s")
+FENCE_RE = re.compile(r"^\s*(```|~~~)")
+# Page break markers: form feeds and HTML comments such as <!-- PageBreak -->.
+PAGE_BREAK_RE = re.compile(r"^\s*(\f|<!--\s*page[\s_-]*break\s*-->)", re.IGNORECASE)
+TABLE_ROW_RE = re.compile(r"^\s*\|")
+TABLE_SEPARATOR_RE = re.compile(r"^\s*\|?\s*:?-{3,}")
+
+# Strength of a split point before a line, from weakest to strongest.
+# SPLIT_NEVER marks lines inside a code block, which are never split.
+SPLIT_NEVER, SPLIT_LINE, SPLIT_PARAGRAPH, SPLIT_SECTION = -1, 0, 1, 2
+
+
+def split_points(lines):
+    """
+    Rates every line as a place to split before it: SPLIT_SECTION before
+    headings and page breaks, SPLIT_PARAGRAPH at table edges and after blank
+    lines, SPLIT_NEVER inside code blocks (up to and including the closing
+    fence), and SPLIT_LINE elsewhere (including between table rows).
+    """
+    strengths = [SPLIT_LINE] * len(lines)
+    in_fence = False
+    for i, line in enumerate(lines):
+        if in_fence:
+            strengths[i] = SPLIT_NEVER
+            in_fence = not FENCE_RE.match(line)
+            continue
+        in_fence = bool(FENCE_RE.match(line))
+        if i == 0:
+            continue
+        previous = lines[i - 1]
+        is_row, was_row = bool(TABLE_ROW_RE.match(line)), bool(TABLE_ROW_RE.match(previous))
+        if HEADING_RE.match(line) or PAGE_BREAK_RE.match(line):
+            strengths[i] = SPLIT_SECTION
+        elif is_row != was_row or (not previous.strip() and line.strip() and not is_row):
+            strengths[i] = SPLIT_PARAGRAPH
+    return strengths
+
+
+def table_header(lines, start):
+    """
+    Returns the header and separator rows of the table containing line
+    `start`, or an empty list if it has none.
+    """
+    first = start
+    while first > 0 and TABLE_ROW_RE.match(lines[first - 1]):
+        first -= 1
+    if first + 1 < start and TABLE_SEPARATOR_RE.match(lines[first + 1]):
+        return lines[first:first + 2]
+    return []
+
+
+def split_markdown(markdown, chunk_chars=CHUNK_CHARS):
+    """
+    Splits markdown into chunks of about `chunk_chars` characters. Each chunk
+    ends at the strongest boundary (a heading or page break, else a table edge
+    or paragraph, else any line) in the second half of its size limit, so
+    sections and tables are only cut when they are larger than that. Code
+    blocks are never cut: a chunk ends before a code block that does not fit,
+    or after it if the block alone is larger than a chunk.
+
+    When a table is cut, its header rows are repeated at the start of the next
+    chunk so the model sees the columns; stitch_chunks removes them again.
+
+    Returns:
+        A list of (text, repeats_table_header, split_strength) tuples, where
+        split_strength is the strength of the boundary before the chunk (None
+        for the first one). Joining the texts without the repeated headers,
+        with newlines, gives back `markdown`.
+    """
+    lines = markdown.split("\n")
+    strengths = split_points(lines)
+    # offsets[i] is the length of lines[:i] joined with newlines.
+    offsets = [0]
+    for line in lines:
+        offsets.append(offsets[-1] + len(line) + 1)
+
+    chunks, start = [], 0
+    while start < len(lines):
+        end = start + 1
+        while end < len(lines) and offsets[end + 1] - offsets[start] <= chunk_chars:
+            end += 1
+        if end < len(lines):
+            earliest = start + 1
+            while offsets[earliest] - offsets[start] < chunk_chars * MIN_CHUNK_FRACTION:
+                earliest += 1
+            if earliest < end:
+                end = max(range(earliest, end + 1), key=lambda i: (strengths[i], i))
+            if strengths[end] == SPLIT_NEVER:
+                # End before the code block, or after it if the chunk starts with it.
+                before = [i for i in range(start + 1, end) if strengths[i] != SPLIT_NEVER]
+                if before:
+                    end = before[-1]
+                else:
+                    while end < len(lines) and strengths[end] == SPLIT_NEVER:
+                        end += 1
+        chunks.append((start, end))
+        start = end
+
+    result = []
+    for start, end in chunks:
+        header = []
+        if start > 0 and TABLE_ROW_RE.match(lines[start]) and TABLE_ROW_RE.match(lines[start - 1]):
+            header = table_header(lines, start)
+        strength = strengths[start] if start > 0 else None
+        result.append(("\n".join(header + lines[start:end]), bool(header), strength))
+    return result
+
+
+def strip_code_fence(text, source):
+    """
+    Removes a ```markdown fence the model sometimes wraps its answer in. The
+    fence is kept if it names another language, or if the `source` chunk
+    itself starts with a code block, since it is then part of the content.
+    """
+    text = text.strip()
+    if FENCE_RE.match(source.lstrip("\n")):
+        return text
+    match = re.fullmatch(r"```(?:markdown|md)?\n(.*)\n```", text, re.DOTALL | re.IGNORECASE)
+    return match.group(1).strip() if match else text
+
+
+def stitch_chunks(parts):
+    """
+    Joins enriched chunks in order and repairs the seams between them:
+
+    * A table continued from the previous chunk loses its repeated header
+      rows and is joined without a blank line, so it stays one table.
+    * At a seam that was cut inside a paragraph (split strength SPLIT_LINE),
+      a sentence cut in the middle (the previous chunk ends without closing
+      punctuation and the next starts in lower case) is joined with a space,
+      and anything else with a line break.
+    * Otherwise, chunks are separated by one blank line.
+
+    Args:
+        parts: (enriched_text, repeats_table_header, split_strength) tuples,
+            in document order, with the strengths returned by split_markdown.
+    """
+    stitched = ""
+    for text, repeats_table_header, split_strength in parts:
+        text = text.strip()
+        if not stitched:
+            stitched = text
+            continue
+        last_line = stitched.rsplit("\n", 1)[-1]
+        lines = text.split("\n")
+        if repeats_table_header and TABLE_ROW_RE.match(last_line) and TABLE_ROW_RE.match(lines[0]):
+            if len(lines) > 1 and TABLE_SEPARATOR_RE.match(lines[1]):
+                lines = lines[2:]
+            stitched += "\n" + "\n".join(lines)
+        elif split_strength == SPLIT_LINE:
+            if (last_line and not re.search(r"[.!?:;|]\W*$", last_line)
+                    and not HEADING_RE.match(last_line) and text[:1].islower()):
+                stitched += " " + text
+            else:
+                stitched += "\n" + text
+        else:
+            stitched += "\n\n" + text
+    return stitched + "\n"
+
+
+async def enrich_chunks(client, chunks, config, concurrency):
+    """
+    Enriches all chunks with at most `concurrency` requests in flight and
+    returns the enriched texts in the order of `chunks`. With enough
+    concurrency for every chunk, this takes about as long as the slowest one.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    start_time = time.time()
+
+    async def enrich(index, text):
+        async with semaphore:
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                try:
+                    response = await client.aio.models.generate_content(
+                        model=MODEL_ID, contents=text, config=config
+                    )
+                    if not response.text:
+                        raise ValueError("Empty response.")
+                    break
+                except Exception as e:
+                    if attempt == MAX_ATTEMPTS:
+                        raise RuntimeError(f"Chunk {index + 1} failed: {e}") from e
+                    await asyncio.sleep(2 ** attempt)
+        source = " (from cache)" if getattr(response, "cached", False) else ""
+        print(f"--- Chunk {index + 1}/{len(chunks)} done after "
+              f"{time.time() - start_time:.1f} seconds{source} ---")
+        return strip_code_fence(response.text, text)
+
+    return await asyncio.gather(*(enrich(i, text) for i, (text, *_) in enumerate(chunks)))
+
 def main():
     # 1. Load Environment Variables
     load_dotenv()
@@ -20,6 +244,11 @@ def main():
     )
     parser.add_argument("--input-file", required=True, help="Path to the standard .md file.")
     parser.add_argument("--output-file", required=True, help="Path to save the enriched .md file.")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH, help="SQLite file of the shared LLM response cache.")
+    parser.add_argument("--no-cache", action="store_true", help="Always call the API, without reading or writing the cache.")
+    parser.add_argument("--chunked", action="store_true", help="Split the file at headings, page breaks and tables and enrich the chunks in parallel.")
+    parser.add_argument("--chunk-chars", type=int, default=CHUNK_CHARS, help=f"Target chunk size in characters for --chunked (default: {CHUNK_CHARS:,}).")
+    parser.add_argument("--concurrency", type=int, default=16, help="Maximum number of chunks enriched at once with --chunked (default: 16).")
     
     args = parser.parse_args()
 
@@ -42,46 +271,52 @@ def main():
 
     # 5. Initialize Client
     client = genai.Client(api_key=api_key)
+    if not args.no_cache:
+        # Re-enriching an unchanged file returns the stored result instantly
+        client = CachedClient(client, LLMResponseCache(args.cache_path))
 
     # 6. Define Prompt
-    system_instruction = """
-    You are an expert financial document formatter. 
-    Your task is to take the provided raw text (which is a 10-K filing converted from HTML/PDF) and format it into perfect, readable Markdown.
-    
-    Rules:
-    1. Do NOT summarize. Do NOT omit any text. Keep the content exactly as is.
-    2. Format financial tables using Markdown tables. Ensure headers align correctly.
-    3. Use proper # H1, ## H2, ### H3 tags for headers based on the document structure.
-    4. Fix broken line breaks inside paragraphs.
-    5. Return ONLY the markdown.
-    """
-
     config = types.GenerateContentConfig(
         temperature=0.1,
-        system_instruction=system_instruction
+        system_instruction=SYSTEM_INSTRUCTION + (CHUNK_INSTRUCTION if args.chunked else "")
     )
 
     # 7. Generate
-    print(f"--- Sending to {MODEL_ID}... (This may take 1-4 minutes for large filings) ---")
     start_time = time.time()
-    
-    try:
-        response = client.models.generate_content(
-            model=MODEL_ID,
-            contents=raw_markdown,
-            config=config
+    if args.chunked:
+        chunks = split_markdown(raw_markdown, args.chunk_chars)
+        print(f"--- Sending {len(chunks)} chunks to {MODEL_ID}, "
+              f"{min(args.concurrency, len(chunks))} at a time... ---")
+        try:
+            enriched = asyncio.run(enrich_chunks(client, chunks, config, args.concurrency))
+        except Exception as e:
+            print(f"Error calling Gemini API: {e}", file=sys.stderr)
+            sys.exit(1)
+        output_text = stitch_chunks(
+            (text, repeats, strength) for text, (_, repeats, strength) in zip(enriched, chunks)
         )
-    except Exception as e:
-        print(f"Error calling Gemini API: {e}", file=sys.stderr)
-        sys.exit(1)
+        source = ""
+    else:
+        print(f"--- Sending to {MODEL_ID}... (This may take 1-4 minutes for large filings) ---")
+        try:
+            response = client.models.generate_content(
+                model=MODEL_ID,
+                contents=raw_markdown,
+                config=config
+            )
+        except Exception as e:
+            print(f"Error calling Gemini API: {e}", file=sys.stderr)
+            sys.exit(1)
+        output_text = response.text
+        source = " (from cache)" if getattr(response, "cached", False) else ""
 
     elapsed = time.time() - start_time
-    print(f"--- Processing Complete in {elapsed:.1f} seconds ---")
+    print(f"--- Processing Complete in {elapsed:.1f} seconds{source} ---")
 
     # 8. Save
     try:
         with open(args.output_file, 'w', encoding='utf-8') as f:
-            f.write(response.text)
+            f.write(output_text)
         print(f"--- Success! Saved to '{args.output_file}' ---")
     except Exception as e:
         print(f"Error saving file: {e}", file=sys.stderr)
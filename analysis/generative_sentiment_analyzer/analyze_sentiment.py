@@ -10,6 +10,16 @@ Usage:
         --file "path/to/your/document.md" \
         --question "What is the sentiment regarding future outlook?"
 
+Batch mode (every file x every question, run concurrently, JSONL output):
+    python analyze_sentiment.py \
+        --input-dir "path/to/filings/" \
+        --questions-file questions.txt \
+        --output results.jsonl --concurrency 16 --tpm-budget 1000000
+
+Responses are cached on disk (see common/llm_cache.py), so asking the same
+question about the same file again returns the stored answer without an API
+call. Use --no-cache to always call the API.
+
 Security:
     Requires the 'GEMINI_API_KEY' environment variable to be set.
 """
@@ -17,11 +27,31 @@ Security:
 import os
 import sys
 import argparse
+import asyncio
 import json
-import google.generai as genai
-from google.generai import types
+import time
+from collections import deque
+from types import SimpleNamespace
+from google import genai
+from google.genai import types
 from dotenv import load_dotenv
 
+# Shared LLM response cache from the repository's common/ directory
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+from llm_cache import DEFAULT_CACHE_PATH, CachedClient, LLMResponseCache
+
+MODEL_ID = "gemini-flash-latest"
+
+# --- Batch mode configuration ---
+# File types picked up from --input-dir.
+BATCH_FILE_SUFFIXES = (".md", ".txt")
+# Rough number of characters per token, to estimate the size of a request.
+CHARS_PER_TOKEN = 4
+# Tokens reserved for the answer when estimating a request.
+RESPONSE_TOKENS = 512
+# Attempts per request before it is reported as failed, with exponential backoff.
+MAX_ATTEMPTS = 3
+
 def get_gemini_client():
     """
     Initializes and returns the Gemini client, checking for the API key.
@@ -95,31 +125,35 @@ def build_prompt(content, question):
     ---
     """
 
-def analyze_document_sentiment(client, content, question):
+def build_request(content, question):
     """
-    Sends the content and question to the Gemini API for analysis.
+    Returns the (contents, config) of the generate_content call for a document
+    and a question.
     """
-    model = "gemini-flash-latest"
-    schema = get_analysis_schema()
-    prompt = build_prompt(content, question)
-
     config = types.GenerateContentConfig(
         response_mime_type="application/json",
-        response_schema=schema,
+        response_schema=get_analysis_schema(),
     )
 
     contents = [
         types.Content(
             role="user",
-            parts=[types.Part.from_text(text=prompt)],
+            parts=[types.Part.from_text(text=build_prompt(content, question))],
         ),
     ]
+    return contents, config
+
+def analyze_document_sentiment(client, content, question):
+    """
+    Sends the content and question to the Gemini API for analysis.
+    """
+    contents, config = build_request(content, question)
 
     print("Analyzing document... (This may take a moment)")
     try:
         # Use the non-streaming generate_content for a single JSON response
         response = client.models.generate_content(
-            model=model,
+            model=MODEL_ID,
             contents=contents,
             config=config,
         )
@@ -128,6 +162,238 @@ def analyze_document_sentiment(client, content, question):
         print(f"Error during API call: {e}")
         return None
 
+# --- Batch mode ---
+
+def estimate_tokens(contents):
+    """Estimates the tokens of a request from the length of its text parts."""
+    characters = sum(
+        len(part.text or "") for content in contents for part in content.parts
+    )
+    return characters // CHARS_PER_TOKEN + RESPONSE_TOKENS
+
+class TokenBudget:
+    """
+    Limits the tokens sent per minute. Each request waits until the tokens
+    used in the last 60 seconds plus its own estimate fit into the budget.
+    """
+
+    def __init__(self, tokens_per_minute):
+        self.tokens_per_minute = tokens_per_minute
+        self._window = deque()  # (timestamp, tokens)
+        self._used = 0
+        self._lock = asyncio.Lock()
+
+    def _expire(self, now):
+        while self._window and now - self._window[0][0] >= 60:
+            self._used -= self._window.popleft()[1]
+
+    async def acquire(self, tokens):
+        """Waits for room for `tokens`, then records them."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._expire(now)
+                # A request larger than the whole budget runs alone.
+                if self._used + tokens <= self.tokens_per_minute or not self._window:
+                    break
+                await asyncio.sleep(60 - (now - self._window[0][0]))
+            self._window.append((now, tokens))
+            self._used += tokens
+
+    def correct(self, tokens):
+        """Records the difference between the actual and the estimated tokens."""
+        self._window.append((time.monotonic(), tokens))
+        self._used += tokens
+
+class _BudgetedAsyncModels:
+    """Async models API that takes tokens from a TokenBudget before each call."""
+
+    def __init__(self, models, budget):
+        self._models = models
+        self._budget = budget
+
+    async def generate_content(self, *, model, contents, config=None, **kwargs):
+        estimate = estimate_tokens(contents)
+        await self._budget.acquire(estimate)
+        response = await self._models.generate_content(
+            model=model, contents=contents, config=config, **kwargs
+        )
+        usage = getattr(response, "usage_metadata", None)
+        actual = getattr(usage, "total_token_count", None)
+        if actual:
+            self._budget.correct(actual - estimate)
+        return response
+
+def budgeted_client(client, budget):
+    """
+    Wraps a client so its async calls respect a TokenBudget. When the result
+    is wrapped in a CachedClient, cached answers do not use the budget.
+    """
+    return SimpleNamespace(
+        models=client.models,
+        aio=SimpleNamespace(models=_BudgetedAsyncModels(client.aio.models, budget)),
+    )
+
+def collect_batch_files(input_dir=None, manifest=None):
+    """
+    Returns the files to analyze: the .md/.txt files of `input_dir` (sorted),
+    or the paths listed in `manifest`, one per line (relative paths are
+    relative to the manifest).
+    """
+    if input_dir:
+        return sorted(
+            os.path.join(input_dir, name)
+            for name in os.listdir(input_dir)
+            if name.lower().endswith(BATCH_FILE_SUFFIXES)
+        )
+    base_dir = os.path.dirname(os.path.abspath(manifest))
+    with open(manifest, 'r', encoding='utf-8') as f:
+        return [
+            os.path.join(base_dir, line.strip())
+            for line in f
+            if line.strip() and not line.startswith("#")
+        ]
+
+def read_questions(questions, questions_file=None):
+    """Returns the --question values plus the lines of --questions-file."""
+    questions = list(questions or [])
+    if questions_file:
+        with open(questions_file, 'r', encoding='utf-8') as f:
+            questions += [line.strip() for line in f if line.strip()]
+    return questions
+
+async def analyze_file(client, file_slots, semaphore, path, questions, records):
+    """
+    Reads one file once and analyzes it for every question, putting one
+    result record per question on the `records` queue as it finishes.
+    `file_slots` limits how many files are held in memory at a time.
+    """
+    async with file_slots:
+        try:
+            content = await asyncio.to_thread(_read_text, path)
+            if not content.strip():
+                raise ValueError("File is empty.")
+        except Exception as e:
+            for question in questions:
+                records.put_nowait({
+                    "file": path, "question": question, "result": None,
+                    "error": f"{type(e).__name__}: {e}", "seconds": 0.0,
+                })
+            return
+
+        async def ask(question):
+            records.put_nowait(
+                await analyze_one(client, semaphore, path, content, question)
+            )
+
+        await asyncio.gather(*(ask(question) for question in questions))
+
+async def analyze_one(client, semaphore, path, content, question):
+    """Analyzes one (file, question) pair and returns its result record."""
+    record = {"file": path, "question": question, "result": None, "error": None}
+    async with semaphore:
+        start = time.monotonic()
+        try:
+            contents, config = build_request(content, question)
+            for attempt in range(1, MAX_ATTEMPTS + 1):
+                try:
+                    response = await client.aio.models.generate_content(
+                        model=MODEL_ID, contents=contents, config=config
+                    )
+                    break
+                except Exception:
+                    if attempt == MAX_ATTEMPTS:
+                        raise
+                    await asyncio.sleep(2 ** attempt)
+            record["result"] = json.loads(response.text)
+            record["cached"] = getattr(response, "cached", False)
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+        record["seconds"] = round(time.monotonic() - start, 2)
+    return record
+
+def _read_text(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+async def run_batch(client, files, questions, output, concurrency):
+    """
+    Runs every (file, question) pair with at most `concurrency` requests in
+    flight and writes one JSON line per pair to `output` as soon as it
+    finishes (so the order differs from the input). Each file is read once
+    for all its questions, and at most `concurrency` files are held in
+    memory at a time.
+
+    Returns:
+        (number of successful pairs, number of failed pairs).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    file_slots = asyncio.Semaphore(concurrency)
+    records = asyncio.Queue()
+    tasks = [
+        asyncio.create_task(
+            analyze_file(client, file_slots, semaphore, path, questions, records)
+        )
+        for path in files
+    ]
+    total = len(files) * len(questions)
+    succeeded = failed = 0
+    start = time.monotonic()
+    for _ in range(total):
+        record = await records.get()
+        output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        output.flush()
+        if record["error"]:
+            failed += 1
+            print(f"Failed: {record['file']}: {record['error']}", file=sys.stderr)
+        else:
+            succeeded += 1
+        done = succeeded + failed
+        if done % 50 == 0 or done == total:
+            print(f"{done:,}/{total:,} done in {time.monotonic() - start:.0f}s",
+                  file=sys.stderr)
+    await asyncio.gather(*tasks)
+    return succeeded, failed
+
+def main_batch(args):
+    """Batch mode: every file x every question, concurrently, as JSONL."""
+    try:
+        files = collect_batch_files(args.input_dir, args.manifest)
+        questions = read_questions(args.question, args.questions_file)
+    except OSError as e:
+        print(f"Error reading the batch inputs: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not files:
+        print("Error: No input files found.", file=sys.stderr)
+        sys.exit(1)
+    if not questions:
+        print("Error: Pass at least one --question or a --questions-file.", file=sys.stderr)
+        sys.exit(1)
+
+    client = get_gemini_client()
+    if args.tpm_budget:
+        client = budgeted_client(client, TokenBudget(args.tpm_budget))
+    if not args.no_cache:
+        client = CachedClient(client, LLMResponseCache(args.cache_path))
+
+    print(f"Analyzing {len(files):,} files x {len(questions):,} questions "
+          f"with up to {args.concurrency} concurrent requests...", file=sys.stderr)
+    output = sys.stdout if args.output == "-" else open(args.output, 'w', encoding='utf-8')
+    try:
+        succeeded, failed = asyncio.run(
+            run_batch(client, files, questions, output, args.concurrency)
+        )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(f"Finished: {succeeded:,} succeeded, {failed:,} failed.", file=sys.stderr)
+    if not args.no_cache:
+        stats = client.cache.stats()
+        print(f"Cache: {stats['hits']:,} hits, {stats['misses']:,} misses.", file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
 def main():
     """
     Main execution function: parses arguments, reads file, triggers analysis.
@@ -136,19 +402,69 @@ def main():
         description="Analyze sentiment of a local financial document.",
         formatter_class=argparse.RawTextHelpFormatter
     )
-    parser.add_argument(
+    inputs = parser.add_mutually_exclusive_group(required=True)
+    inputs.add_argument(
         "--file",
-        required=True,
         help="Path to the .md or .txt file to analyze."
     )
+    inputs.add_argument(
+        "--input-dir",
+        help="Batch mode: analyze every .md and .txt file in this directory."
+    )
+    inputs.add_argument(
+        "--manifest",
+        help="Batch mode: text file listing the files to analyze, one per line."
+    )
     parser.add_argument(
         "--question",
-        required=True,
+        action="append",
         help="The specific question to ask about the document.\n"
-             "Example: \"What is the sentiment regarding 'Business Outlook'?\""
+             "Example: \"What is the sentiment regarding 'Business Outlook'?\"\n"
+             "In batch mode, can be given several times."
+    )
+    parser.add_argument(
+        "--questions-file",
+        help="Batch mode: text file with one question per line."
+    )
+    parser.add_argument(
+        "--output",
+        default="-",
+        help="Batch mode: JSONL file for the results ('-' for stdout).\n"
+             "Default: -"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Batch mode: maximum number of requests in flight. Default: 8"
+    )
+    parser.add_argument(
+        "--tpm-budget",
+        type=int,
+        help="Batch mode: maximum tokens sent per minute (estimated from the\n"
+             "prompt length and corrected with the reported usage)."
+    )
+    parser.add_argument(
+        "--cache-path",
+        default=DEFAULT_CACHE_PATH,
+        help="SQLite file of the shared LLM response cache.\n"
+             f"Default: {DEFAULT_CACHE_PATH}"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the API, without reading or writing the cache."
     )
     args = parser.parse_args()
 
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1.")
+    if args.input_dir or args.manifest:
+        main_batch(args)
+        return
+    if not args.question or len(args.question) != 1 or args.questions_file:
+        parser.error("--file needs exactly one --question.")
+
     # Read file content
     try:
         with open(args.file, 'r', encoding='utf-8') as f:
@@ -165,10 +481,12 @@ def main():
         sys.exit(1)
 
     client = get_gemini_client()
+    if not args.no_cache:
+        client = CachedClient(client, LLMResponseCache(args.cache_path))
     result_json_text = analyze_document_sentiment(
         client, 
         content, 
-        args.question
+        args.question[0]
     )
 
     if result_json_text:
@@ -182,5 +500,10 @@ def main():
             print(f"Raw response: {result_json_text}")
         print("-----------------------")
 
+    if not args.no_cache:
+        stats = client.cache.stats()
+        source = "cache" if stats["hits"] else "API"
+        print(f"(Answer from the {source}; {stats['entries']:,} responses cached.)")
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,439 @@
+"""
+FinancialReports Common Module: LLM Response Cache
+
+A shared, content-addressed on-disk cache for `generate_content` calls of the
+Google GenAI client. A response is stored under a SHA-256 hash of the model
+id, the prompt contents and the generation config (which includes the
+response schema), so re-running a script over the same filings returns the
+stored answers instantly instead of paying for the calls again.
+
+The cache is a single SQLite file, shared by all scripts and safe to use from
+several processes. Entries expire after a time-to-live, and the least
+recently used entries are evicted when the file grows beyond a size limit.
+
+Usage:
+    from llm_cache import CachedClient, LLMResponseCache
+
+    client = CachedClient(genai.Client(api_key=...), LLMResponseCache())
+    response = client.models.generate_content(model=..., contents=..., config=...)
+    print(response.text, client.cache.stats())
+
+Command line:
+    python llm_cache.py --stats | --prune | --clear [--cache-path PATH]
+"""
+
+import argparse
+import asyncio
+import base64
+import enum
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import typing
+from pathlib import Path
+
+# Default location, shared by every script. Override with FR_LLM_CACHE_PATH.
+DEFAULT_CACHE_PATH = Path(
+    os.environ.get(
+        "FR_LLM_CACHE_PATH", Path.home() / ".cache" / "financialreports" / "llm_cache.db"
+    )
+)
+# Size limit of the stored responses, in bytes.
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Entries older than this are treated as missing, in seconds.
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600
+# Part of every key; change it to invalidate all entries after a format change.
+KEY_VERSION = 1
+# Rows deleted per step while evicting.
+EVICTION_BATCH = 100
+
+
+def _to_jsonable(value):
+    """
+    Converts prompt contents and configs into plain JSON values. SDK objects
+    (pydantic models such as types.Content or types.GenerateContentConfig)
+    are dumped without their unset fields, so equal requests give equal keys.
+    A pydantic model class used as response schema is keyed by its JSON schema.
+    """
+    if isinstance(value, type) and hasattr(value, "model_json_schema"):
+        # A pydantic model class used as response_schema.
+        return _to_jsonable(value.model_json_schema())
+    if typing.get_origin(value) is list:
+        return {"list_of": _to_jsonable(list(typing.get_args(value)))}
+    if hasattr(value, "model_dump"):
+        # Python mode keeps model classes (e.g. a response_schema) as they are.
+        return _to_jsonable(value.model_dump(mode="python", exclude_none=True))
+    if isinstance(value, dict):
+        return {str(key): _to_jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_jsonable(item) for item in value]
+    if isinstance(value, enum.Enum):
+        return _to_jsonable(value.value)
+    if isinstance(value, bytes):
+        return {"bytes_base64": base64.b64encode(value).decode("ascii")}
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    raise TypeError(f"Cannot build a cache key from a {type(value).__name__} value.")
+
+
+def cache_key(model: str, contents, config=None) -> str:
+    """Returns the SHA-256 hex digest identifying a generate_content request."""
+    request = {
+        "version": KEY_VERSION,
+        "model": model,
+        "contents": _to_jsonable(contents),
+        "config": _to_jsonable(config),
+    }
+    canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    On-disk cache of response texts with a size-based LRU eviction and a TTL.
+
+    `hits`, `misses`, `expired`, `evictions` and `writes` count the operations
+    of this instance; stats() adds the size of the shared cache file.
+
+    An instance may be used from several threads (the async client reads and
+    writes it on worker threads); its operations are serialized by a lock.
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_CACHE_PATH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = self.misses = self.expired = self.evictions = self.writes = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Several processes may share the file; wait for locks instead of failing.
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL, "
+            "size INTEGER NOT NULL, created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)"
+        )
+        self._conn.commit()
+        # Running total of the stored sizes, so puts don't have to sum the table.
+        # Re-read before evicting, since other processes may write as well.
+        self._total_bytes = self._stored_bytes()
+
+    def _stored_bytes(self) -> int:
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return total
+
+    def get(self, key: str):
+        """Returns the cached response text for `key`, or None."""
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key: str):
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        response, created_at = row
+        with self._conn:
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+            )
+        self.hits += 1
+        return response
+
+    def put(self, key: str, response: str, model: str = None):
+        """Stores a response text, then evicts old entries if over the size limit."""
+        with self._lock:
+            self._put(key, response, model)
+
+    def _put(self, key: str, response: str, model: str = None):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._conn:
+            previous = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, response, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now),
+            )
+        self.writes += 1
+        self._total_bytes += size - (previous[0] if previous else 0)
+        if self._total_bytes > self.max_bytes:
+            self._evict()
+
+    def _evict(self):
+        """Deletes the least recently used entries until the cache fits max_bytes."""
+        total = self._stored_bytes()
+        while total > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_used LIMIT ?",
+                (EVICTION_BATCH,),
+            ).fetchall()
+            if not rows:
+                break
+            victims = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                victims.append((key,))
+                total -= size
+            with self._conn:
+                self._conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+            self.evictions += len(victims)
+        self._total_bytes = total
+
+    def prune(self) -> int:
+        """Deletes all expired entries and returns how many were removed."""
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?",
+                    (time.time() - self.ttl_seconds,),
+                )
+            self._total_bytes = self._stored_bytes()
+        return cursor.rowcount
+
+    def clear(self):
+        """Deletes every entry."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM responses")
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        """Returns the counters of this instance and the size of the cache."""
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "writes": self.writes,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _response_schema(config):
+    """The response_schema of a generation config (an SDK object or a dict)."""
+    if isinstance(config, dict):
+        return config.get("response_schema")
+    return getattr(config, "response_schema", None)
+
+
+def _validate(schema, value):
+    """
+    Rebuilds a JSON value as the SDK does for `.parsed`: an instance of a
+    pydantic model class, or a list of them for list[Model]. Any other schema
+    (types.Schema, a dict) gives the plain JSON value.
+    """
+    if isinstance(schema, type) and hasattr(schema, "model_validate"):
+        return schema.model_validate(value)
+    if typing.get_origin(schema) is list and isinstance(value, list):
+        (item_schema,) = typing.get_args(schema) or (None,)
+        return [_validate(item_schema, item) for item in value]
+    return value
+
+
+class CachedResponse:
+    """
+    A response served from the cache. Offers `.text` and `.parsed` like the
+    SDK's. `.parsed` is rebuilt from the text with the request's
+    response_schema, so a hit gives the same type as a live response.
+    """
+
+    cached = True
+
+    def __init__(self, text: str, response_schema=None):
+        self.text = text
+        self._response_schema = response_schema
+
+    @property
+    def parsed(self):
+        """The text decoded as JSON and validated against the response schema, or None."""
+        try:
+            return _validate(self._response_schema, json.loads(self.text))
+        except ValueError:  # Also pydantic's ValidationError.
+            return None
+
+
+class _CachedModels:
+    """Wraps `client.models` (or `client.aio.models`) with the cache."""
+
+    def __init__(self, models, cache: LLMResponseCache, is_async: bool):
+        self._models = models
+        self._cache = cache
+        self._is_async = is_async
+
+    def generate_content(self, *, model: str, contents, config=None, **kwargs):
+        key = cache_key(model, contents, config)
+        if self._is_async:
+            return self._generate_async(key, model, contents, config, kwargs)
+        text = self._cache.get(key)
+        if text is not None:
+            return CachedResponse(text, _response_schema(config))
+        response = self._models.generate_content(
+            model=model, contents=contents, config=config, **kwargs
+        )
+        self._store(key, model, response)
+        return response
+
+    async def _generate_async(self, key, model, contents, config, kwargs):
+        # SQLite calls block, so they run on a worker thread, not the event loop.
+        text = await asyncio.to_thread(self._cache.get, key)
+        if text is not None:
+            return CachedResponse(text, _response_schema(config))
+        response = await self._models.generate_content(
+            model=model, contents=contents, config=config, **kwargs
+        )
+        await asyncio.to_thread(self._store, key, model, response)
+        return response
+
+    def _store(self, key, model, response):
+        # Only complete answers are cached; blocked or empty responses are retried.
+        text = getattr(response, "text", None)
+        if text:
+            self._cache.put(key, text, model)
+
+    def __getattr__(self, name):
+        return getattr(self._models, name)
+
+
+class _CachedAio:
+    def __init__(self, aio, cache: LLMResponseCache):
+        self._aio = aio
+        self.models = _CachedModels(aio.models, cache, is_async=True)
+
+    def __getattr__(self, name):
+        return getattr(self._aio, name)
+
+
+class CachedClient:
+    """
+    Wraps a GenAI client so that `client.models.generate_content` and
+    `client.aio.models.generate_content` are served from the cache when the
+    same request was made before. Everything else is passed through.
+
+    Any object with the same `models.generate_content` method can be wrapped,
+    for example a StandInClient in tests.
+    """
+
+    def __init__(self, client, cache: LLMResponseCache = None):
+        self._client = client
+        self.cache = cache if cache is not None else LLMResponseCache()
+        self.models = _CachedModels(client.models, self.cache, is_async=False)
+        if hasattr(client, "aio"):
+            self.aio = _CachedAio(client.aio, self.cache)
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class StandInClient:
+    """
+    A local stand-in for the GenAI client, for tests and dry runs. Every call
+    returns `respond(model, contents, config)` as the response text, without
+    any network access. `calls` counts the calls that reached it.
+    """
+
+    def __init__(self, respond=None):
+        self.respond = respond or (lambda model, contents, config: "{}")
+        self.calls = 0
+        self.models = _StandInModels(self)
+        self.aio = _StandInAio(self)
+
+
+class _StandInResponse:
+    cached = False
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class _StandInModels:
+    def __init__(self, client: StandInClient):
+        self._client = client
+
+    def generate_content(self, *, model, contents, config=None, **kwargs):
+        self._client.calls += 1
+        return _StandInResponse(self._client.respond(model, contents, config))
+
+
+class _StandInAsyncModels(_StandInModels):
+    async def generate_content(self, *, model, contents, config=None, **kwargs):
+        return super().generate_content(model=model, contents=contents, config=config)
+
+
+class _StandInAio:
+    def __init__(self, client: StandInClient):
+        self.models = _StandInAsyncModels(client)
+
+
+def main():
+    """Shows statistics of the shared cache, or prunes or clears it."""
+    parser = argparse.ArgumentParser(
+        description="Inspect or clean the shared LLM response cache.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH, help="Cache file.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--stats", action="store_true", help="Show the number and size of entries.")
+    group.add_argument("--prune", action="store_true", help="Delete expired entries.")
+    group.add_argument("--clear", action="store_true", help="Delete all entries.")
+    args = parser.parse_args()
+
+    try:
+        with LLMResponseCache(args.cache_path) as cache:
+            if args.prune:
+                print(f"Deleted {cache.prune():,} expired entries.")
+            elif args.clear:
+                cache.clear()
+                print("Cleared the cache.")
+            stats = cache.stats()
+            print(f"{args.cache_path}: {stats['entries']:,} entries, "
+                  f"{stats['bytes'] / 1024**2:.1f} MB")
+    except sqlite3.Error as e:
+        print(f"Error: Could not open the cache '{args.cache_path}': {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import argparse
+import csv
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.json as pa_json
+
+# Configure logging for clear output
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+
+# --- Configuration ---
+# Bytes of input parsed per record batch. Together with the row-group size
+# below, this bounds memory use regardless of the size of the dump.
+BLOCK_SIZE = 16 * 1024 * 1024
+# Rows per Parquet row group (the unit that predicate pushdown can skip).
+ROWS_PER_GROUP = 128 * 1024
+# Partition columns added to every row.
+PARTITION_SCHEMA = pa.schema([("filing_type", pa.string()), ("year", pa.int16())])
+
+# Known column types, so every block of the input gets the same schema.
+# The metadata CSV and the metadata JSONL use different column names.
+CSV_COLUMN_TYPES = {
+    "id": pa.int64(),
+    "company_id": pa.int64(),
+    "release_date": pa.date32(),
+}
+JSON_COLUMN_TYPES = {
+    "filing_id": pa.int64(),
+    "company_id": pa.int64(),
+    "release_date": pa.timestamp("s"),
+}
+# Lines of a JSONL file read to collect its field names. Fields whose value is
+# null in a whole block would otherwise be inferred as the null type, and the
+# reader fails when a later block has a value for them.
+SCHEMA_SAMPLE_LINES = 1000
+
+
+def read_json_fields(input_path: Path) -> list:
+    """Returns the field names of the first records of a JSONL file, in order."""
+    fields = {}
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f):
+            if line_number >= SCHEMA_SAMPLE_LINES:
+                break
+            if line.strip():
+                fields.update(dict.fromkeys(json.loads(line)))
+    return list(fields)
+
+
+def open_batch_reader(input_path: Path, input_format: str):
+    """Opens a streaming record-batch reader for a metadata CSV or JSONL file."""
+    if input_format == "csv":
+        # Read the header ourselves so that every column gets a fixed type.
+        with open(input_path, "r", encoding="utf-8", newline="") as f:
+            columns = next(csv.reader(f))
+        column_types = {col: CSV_COLUMN_TYPES.get(col, pa.string()) for col in columns}
+        return pa_csv.open_csv(
+            input_path,
+            read_options=pa_csv.ReadOptions(block_size=BLOCK_SIZE),
+            convert_options=pa_csv.ConvertOptions(column_types=column_types),
+        )
+
+    # Like the CSV header: every field gets a fixed type, text by default.
+    fields = read_json_fields(input_path)
+    schema = pa.schema([(field, JSON_COLUMN_TYPES.get(field, pa.string())) for field in fields])
+    return pa_json.open_json(
+        input_path,
+        read_options=pa_json.ReadOptions(block_size=BLOCK_SIZE),
+        parse_options=pa_json.ParseOptions(
+            explicit_schema=schema,
+            unexpected_field_behavior="error",
+        ),
+    )
+
+
+def add_partition_columns(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """
+    Normalizes release_date to a date and appends the `filing_type` and `year`
+    partition columns.
+    """
+    names = batch.schema.names
+    columns = list(batch.columns)
+
+    date_index = names.index("release_date")
+    release_date = columns[date_index].cast(pa.date32())
+    columns[date_index] = release_date
+
+    if "filing_type" in names:
+        # The JSONL metadata already has the column; move it to the partition key.
+        type_index = names.index("filing_type")
+        filing_type = columns.pop(type_index)
+        names = names[:type_index] + names[type_index + 1 :]
+    else:
+        # The CSV metadata calls it filing_type_code; keep that and add a copy.
+        filing_type = columns[names.index("filing_type_code")]
+
+    columns += [filing_type.cast(pa.string()), pc.year(release_date).cast(pa.int16())]
+    names = list(names) + PARTITION_SCHEMA.names
+    return pa.RecordBatch.from_arrays(columns, names=names)
+
+
+def export_to_parquet(
+    input_path: Path, output_dir: Path, input_format: str, compression: str
+) -> int:
+    """
+    Streams a metadata CSV or JSONL file into a Parquet dataset partitioned
+    by filing type and release year (hive layout, e.g.
+    `filing_type=10-K/year=2024/part-0.parquet`).
+
+    Args:
+        input_path: Path to the metadata CSV or JSONL file.
+        output_dir: Directory for the dataset. Existing partitions written by
+            a previous export are replaced.
+        input_format: 'csv' or 'jsonl'.
+        compression: Parquet compression codec.
+
+    Returns:
+        The total number of rows exported.
+    """
+    start_time = time.time()
+    logging.info(f"Exporting '{input_path}' to Parquet dataset '{output_dir}'...")
+
+    try:
+        reader = open_batch_reader(input_path, input_format)
+    except (OSError, ValueError, pa.ArrowInvalid) as e:
+        logging.error(f"Error: Could not read '{input_path}': {e}")
+        sys.exit(1)
+
+    try:
+        first_batch = add_partition_columns(reader.read_next_batch())
+    except StopIteration:
+        logging.error(f"Error: The file '{input_path}' is empty.")
+        sys.exit(1)
+    total_rows = 0
+
+    def batches():
+        nonlocal total_rows
+        total_rows += first_batch.num_rows
+        yield first_batch
+        for batch in reader:
+            batch = add_partition_columns(batch)
+            total_rows += batch.num_rows
+            yield batch
+
+    try:
+        ds.write_dataset(
+            batches(),
+            output_dir,
+            schema=first_batch.schema,
+            format="parquet",
+            partitioning=ds.partitioning(PARTITION_SCHEMA, flavor="hive"),
+            existing_data_behavior="delete_matching",
+            file_options=ds.ParquetFileFormat().make_write_options(
+                compression=compression
+            ),
+            # No minimum: buffering a full row group for every open partition
+            # would make memory grow with the number of partitions.
+            max_rows_per_group=ROWS_PER_GROUP,
+        )
+    except pa.ArrowInvalid as e:
+        logging.error(f"Error: Failed to convert '{input_path}': {e}")
+        sys.exit(1)
+
+    duration = time.time() - start_time
+    logging.info(
+        f"Successfully exported {total_rows:,} rows in {duration:.2f} seconds."
+    )
+    return total_rows
+
+
+def main():
+    """Main function to parse arguments and run the export."""
+    parser = argparse.ArgumentParser(
+        description="Export FinancialReports metadata (CSV or JSONL) to a "
+        "Parquet dataset partitioned by filing type and release year.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--input",
+        type=Path,
+        required=True,
+        help="Path to the metadata .csv or .jsonl file.",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default="metadata_parquet",
+        help="Directory to write the partitioned dataset to.",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["csv", "jsonl"],
+        default=None,
+        help="Input format. Detected from the file extension if omitted.",
+    )
+    parser.add_argument(
+        "--compression",
+        choices=["zstd", "snappy", "gzip", "none"],
+        default="zstd",
+        help="Parquet compression codec.",
+    )
+    args = parser.parse_args()
+
+    if not args.input.exists():
+        logging.error(f"Input file not found: {args.input}")
+        sys.exit(1)
+
+    input_format = args.format
+    if input_format is None:
+        input_format = "csv" if args.input.suffix.lower() == ".csv" else "jsonl"
+
+    export_to_parquet(args.input, args.output_dir, input_format, args.compression)
+
+    logging.info("Process complete.")
+    logging.info(
+        "Query it with: python ../parse_metadata_jsonl/parse_metadata.py "
+        f"--dataset {args.output_dir} --isin <ISIN>"
+    )
+
+
+if __name__ == "__main__":
+    main()
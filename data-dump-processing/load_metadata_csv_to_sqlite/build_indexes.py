@@ -0,0 +1,317 @@
+import argparse
+import logging
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+# Configure logging for clear output
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+
+# --- Configuration ---
+# The name of the table created by load_to_sqlite.py.
+TABLE_NAME = "filings_metadata"
+
+# Composite indexes for the common access paths, keyed by a short name.
+# Indexes whose columns are missing from the table are skipped.
+INDEX_DEFINITIONS = {
+    "isin_release_date": ("isin", "release_date"),
+    "filing_type_release_date": ("filing_type_code", "release_date"),
+    "release_date": ("release_date",),
+    "country_filing_type": ("country_code", "filing_type_code"),
+}
+
+# The compact view joins every row to its lookup tables, so the fact-table
+# indexes also carry these keys (those the table has). A count through the
+# view then reads only the index, not the table rows.
+COMPACT_JOIN_KEYS = ("company_key", "filing_type_id", "language_id", "country_id")
+
+# The same access paths for the compact schema (see compact_schema.py), where
+# the table is a view over a `<table>_data` fact table and lookup tables.
+# Each entry is a list of (table, columns); "{data}" is the fact table.
+COMPACT_INDEX_DEFINITIONS = {
+    "isin_release_date": [
+        ("companies", ("isin",)),
+        ("{data}", ("company_key", "release_date")),
+    ],
+    "filing_type_release_date": [("{data}", ("filing_type_id", "release_date"))],
+    "release_date": [("{data}", ("release_date",))],
+    "country_filing_type": [("{data}", ("country_id", "filing_type_id"))],
+}
+
+# Standard queries used to measure the effect of the indexes.
+# Each entry is (label, required columns, SQL). Named parameters are filled
+# from a sample row of the table so the queries always return data.
+STANDARD_QUERIES = [
+    (
+        "Annual reports (10-K, 20-F)",
+        ("filing_type_code", "markdown_filename"),
+        "SELECT markdown_filename FROM {table} "
+        "WHERE filing_type_code IN ('10-K', '20-F')",
+    ),
+    (
+        "Filings for one ISIN",
+        ("isin",),
+        "SELECT * FROM {table} WHERE isin = :isin",
+    ),
+    (
+        "Latest filings for one ISIN",
+        ("isin", "release_date"),
+        "SELECT * FROM {table} WHERE isin = :isin "
+        "AND release_date >= :release_date ORDER BY release_date DESC",
+    ),
+    (
+        "Filing type in a date range",
+        ("filing_type_code", "release_date"),
+        "SELECT COUNT(*) FROM {table} WHERE filing_type_code = :filing_type_code "
+        "AND release_date BETWEEN :release_date AND '9999-12-31'",
+    ),
+    (
+        "All filings on one day",
+        ("release_date",),
+        "SELECT COUNT(*) FROM {table} WHERE release_date = :release_date",
+    ),
+    (
+        "Filings for one country",
+        ("country_code",),
+        "SELECT COUNT(*) FROM {table} WHERE country_code = :country_code",
+    ),
+]
+
+# Each query is timed this many times and the fastest run is reported.
+QUERY_REPEATS = 3
+
+
+def quote_identifier(name: str) -> str:
+    """Quotes a table or column name for use in a SQLite statement."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def get_table_columns(conn: sqlite3.Connection, table_name: str) -> list:
+    """Returns the column names of a table (or view)."""
+    rows = conn.execute(f"PRAGMA table_info({quote_identifier(table_name)})")
+    return [row[1] for row in rows]
+
+
+def is_compact_view(conn: sqlite3.Connection, table_name: str) -> bool:
+    """True if `table_name` is the view created by the compact schema."""
+    rows = conn.execute(
+        "SELECT name, type FROM sqlite_master WHERE name IN (?, ?)",
+        (table_name, f"{table_name}_data"),
+    )
+    return dict(rows) == {table_name: "view", f"{table_name}_data": "table"}
+
+
+def get_index_targets(conn: sqlite3.Connection, table_name: str, name: str) -> list:
+    """Returns the (index name, table, columns) entries for one index key."""
+    if not is_compact_view(conn, table_name):
+        return [(f"idx_{table_name}_{name}", table_name, INDEX_DEFINITIONS[name])]
+
+    targets = []
+    for table, columns in COMPACT_INDEX_DEFINITIONS[name]:
+        table = table.format(data=f"{table_name}_data")
+        index_name = f"idx_{table}_{'_'.join(columns)}"
+        if table == f"{table_name}_data":
+            present = set(get_table_columns(conn, table))
+            columns += tuple(
+                key for key in COMPACT_JOIN_KEYS if key in present and key not in columns
+            )
+        targets.append((index_name, table, columns))
+    return targets
+
+
+def get_sample_parameters(conn: sqlite3.Connection, table_name: str) -> dict:
+    """Picks parameter values for the standard queries from one table row."""
+    conn.row_factory = sqlite3.Row
+    try:
+        row = conn.execute(
+            f"SELECT * FROM {quote_identifier(table_name)} LIMIT 1 OFFSET "
+            f"(SELECT COUNT(*) / 2 FROM {quote_identifier(table_name)})"
+        ).fetchone()
+    finally:
+        conn.row_factory = None
+    return dict(row) if row else {}
+
+
+def run_standard_queries(conn: sqlite3.Connection, table_name: str) -> dict:
+    """
+    Times each applicable standard query.
+
+    Returns:
+        A dict mapping query labels to (seconds, row_count, query_plan).
+    """
+    columns = set(get_table_columns(conn, table_name))
+    params = get_sample_parameters(conn, table_name)
+    results = {}
+
+    for label, required, sql in STANDARD_QUERIES:
+        if not columns.issuperset(required):
+            continue
+        sql = sql.format(table=quote_identifier(table_name))
+
+        best = float("inf")
+        row_count = 0
+        for _ in range(QUERY_REPEATS):
+            start = time.perf_counter()
+            row_count = len(conn.execute(sql, params).fetchall())
+            best = min(best, time.perf_counter() - start)
+
+        plan = " | ".join(
+            row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        )
+        results[label] = (best, row_count, plan)
+
+    return results
+
+
+def build_indexes(
+    conn: sqlite3.Connection, table_name: str, index_names: list = None
+) -> list:
+    """
+    Creates the composite indexes for the common access paths, then runs
+    ANALYZE so the query planner has statistics to choose between them.
+    For a compact-schema view the indexes go on its underlying tables.
+
+    Args:
+        conn: An open SQLite connection.
+        table_name: The table to index.
+        index_names: Keys of INDEX_DEFINITIONS to build. Defaults to all.
+
+    Returns:
+        The names of the indexes that were created.
+    """
+    created = []
+
+    for name in index_names or INDEX_DEFINITIONS:
+        for index_name, target, index_columns in get_index_targets(
+            conn, table_name, name
+        ):
+            columns = set(get_table_columns(conn, target))
+            missing = [col for col in index_columns if col not in columns]
+            if missing:
+                logging.info(f"Skipping index '{name}': missing column(s) {missing}.")
+                continue
+
+            column_list = ", ".join(quote_identifier(col) for col in index_columns)
+            start = time.perf_counter()
+            conn.execute(f"DROP INDEX IF EXISTS {quote_identifier(index_name)}")
+            conn.execute(
+                f"CREATE INDEX {quote_identifier(index_name)} "
+                f"ON {quote_identifier(target)} ({column_list})"
+            )
+            conn.commit()
+            logging.info(
+                f"Created index '{index_name}' on {target} "
+                f"({', '.join(index_columns)}) "
+                f"in {time.perf_counter() - start:.2f} seconds."
+            )
+            created.append(index_name)
+
+    start = time.perf_counter()
+    conn.execute("ANALYZE")
+    conn.commit()
+    logging.info(f"ANALYZE completed in {time.perf_counter() - start:.2f} seconds.")
+    return created
+
+
+def log_query_comparison(before: dict, after: dict):
+    """Logs before/after query timings and the query plans after indexing."""
+    logging.info("Standard query timings (best of %d runs):", QUERY_REPEATS)
+    for label, (after_seconds, row_count, plan) in after.items():
+        before_seconds = before.get(label, (float("nan"),))[0]
+        speedup = before_seconds / after_seconds if after_seconds else float("inf")
+        logging.info(
+            f"  {label}: {before_seconds * 1000:.2f} ms -> "
+            f"{after_seconds * 1000:.2f} ms ({speedup:.1f}x, {row_count:,} rows)"
+        )
+        logging.info(f"    plan: {plan}")
+
+
+def index_database(
+    db_path: Path,
+    table_name: str,
+    index_names: list = None,
+    benchmark: bool = False,
+):
+    """
+    Post-load stage: builds indexes on an existing database and optionally
+    measures the standard queries before and after.
+    """
+    if not Path(db_path).exists():
+        logging.error(f"Database not found: {db_path}")
+        sys.exit(1)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        if not get_table_columns(conn, table_name):
+            logging.error(f"Table '{table_name}' not found in '{db_path}'.")
+            sys.exit(1)
+
+        before = run_standard_queries(conn, table_name) if benchmark else {}
+        build_indexes(conn, table_name, index_names)
+        if benchmark:
+            log_query_comparison(before, run_standard_queries(conn, table_name))
+    except sqlite3.Error as e:
+        logging.error(f"SQLite error while indexing '{db_path}': {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+def parse_index_names(value: str) -> list:
+    """argparse type for a comma-separated list of INDEX_DEFINITIONS keys."""
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in INDEX_DEFINITIONS]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"Unknown index name(s) {unknown}. "
+            f"Choose from: {', '.join(INDEX_DEFINITIONS)}."
+        )
+    return names
+
+
+def main():
+    """Main function to parse arguments and build the indexes."""
+    parser = argparse.ArgumentParser(
+        description="Build indexes and planner statistics on a database "
+        "created by load_to_sqlite.py.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--db-name",
+        type=Path,
+        default="financialreports.db",
+        help="Path to the SQLite database file.",
+    )
+    parser.add_argument(
+        "--table-name",
+        type=str,
+        default=TABLE_NAME,
+        help="Name of the metadata table.",
+    )
+    parser.add_argument(
+        "--indexes",
+        type=parse_index_names,
+        default=None,
+        help="Comma-separated subset of indexes to build "
+        f"({', '.join(INDEX_DEFINITIONS)}). Defaults to all.",
+    )
+    parser.add_argument(
+        "--benchmark-queries",
+        action="store_true",
+        help="Time the standard queries before and after indexing.",
+    )
+    args = parser.parse_args()
+
+    index_database(
+        args.db_name, args.table_name, args.indexes, args.benchmark_queries
+    )
+    logging.info("Indexing complete.")
+
+
+if __name__ == "__main__":
+    main()
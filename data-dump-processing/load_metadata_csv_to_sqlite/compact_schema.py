@@ -0,0 +1,238 @@
+"""
+Compact, dictionary-encoded layout for the filings metadata table.
+
+Instead of one wide table that repeats company names, ISINs, LEIs and codes on
+every row, the compact layout stores:
+
+* `companies`: one row per distinct (company_id, name, ISIN, LEI).
+* `filing_types`, `languages`, `countries`: one row per distinct code.
+* `<table>_data`: one row per filing with integer foreign keys. The release
+  date is stored as the original text, so the view exposes it unchanged and
+  date filters on the view can use the fact-table indexes.
+* `<table>`: a view that joins everything back together with the original
+  column names and values, so existing queries keep working.
+
+Lookup rows are keyed on their full value, so the layout is lossless even if
+a company's name or ISIN changes between filings.
+"""
+
+import sqlite3
+
+from build_indexes import quote_identifier
+
+# Columns whose values move into a (id, code) lookup table, and the table name.
+DICTIONARY_COLUMNS = {
+    "filing_type_code": "filing_types",
+    "language_code": "languages",
+    "country_code": "countries",
+}
+# Columns stored once per distinct combination in the `companies` table.
+COMPANY_COLUMNS = ("company_id", "company_name", "isin", "lei")
+COMPANIES_TABLE = "companies"
+# Fact-table column referencing companies.id.
+COMPANY_KEY = "company_key"
+KEY_COLUMN = "id"
+
+
+def drop_table_or_view(conn: sqlite3.Connection, name: str):
+    """Drops `name` whether it is currently a table or a view."""
+    row = conn.execute(
+        "SELECT type FROM sqlite_master WHERE name = ? AND type IN ('table', 'view')",
+        (name,),
+    ).fetchone()
+    if row:
+        conn.execute(f"DROP {row[0].upper()} {quote_identifier(name)}")
+
+
+class CompactSchema:
+    """Creates the compact layout and converts wide CSV rows into it."""
+
+    def __init__(self, table_name: str, columns: list):
+        if KEY_COLUMN not in columns:
+            raise ValueError(f"The compact schema needs an '{KEY_COLUMN}' column.")
+
+        self.table_name = table_name
+        self.fact_table = f"{table_name}_data"
+        self.columns = list(columns)
+        self._index = {col: i for i, col in enumerate(columns)}
+        self._dictionaries = {
+            col: DICTIONARY_COLUMNS[col] for col in columns if col in DICTIONARY_COLUMNS
+        }
+        self._company_columns = [col for col in COMPANY_COLUMNS if col in columns]
+
+        # Fact columns: the company key in place of the company attributes,
+        # dictionary columns replaced by their integer id, the rest as is.
+        self.fact_columns = [COMPANY_KEY] if self._company_columns else []
+        for col in columns:
+            if col in self._company_columns:
+                continue
+            if col in self._dictionaries:
+                self.fact_columns.append(self._id_column(col))
+            else:
+                self.fact_columns.append(col)
+
+        # In-memory copies of the lookup tables: value -> id.
+        self._codes = {col: {} for col in self._dictionaries}
+        self._next_ids = {col: 1 for col in self._dictionaries}
+        self._companies = {}
+        self._next_company_id = 1
+        # Same ids keyed by the raw CSV values, which skips normalizing rows
+        # of companies that were already seen.
+        self._raw_companies = {}
+
+    @staticmethod
+    def _id_column(column: str) -> str:
+        return column[: -len("_code")] + "_id" if column.endswith("_code") else column + "_id"
+
+    def _fact_type(self, column: str) -> str:
+        if column == KEY_COLUMN:
+            return "INTEGER PRIMARY KEY"
+        if column == COMPANY_KEY:
+            return f"INTEGER REFERENCES {COMPANIES_TABLE} (id)"
+        for source, lookup in self._dictionaries.items():
+            if column == self._id_column(source):
+                return f"INTEGER REFERENCES {lookup} (id)"
+        return "TEXT"
+
+    def create(self, conn: sqlite3.Connection, replace: bool):
+        """Creates the lookup tables, the fact table and the compatibility view."""
+        if replace:
+            drop_table_or_view(conn, self.table_name)
+            drop_table_or_view(conn, self.fact_table)
+            for lookup in [COMPANIES_TABLE, *self._dictionaries.values()]:
+                drop_table_or_view(conn, lookup)
+
+        if self._company_columns:
+            company_defs = "".join(
+                f", {quote_identifier(col)} "
+                f"{'INTEGER' if col == 'company_id' else 'TEXT'}"
+                for col in self._company_columns
+            )
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {COMPANIES_TABLE} "
+                f"(id INTEGER PRIMARY KEY{company_defs})"
+            )
+        for lookup in self._dictionaries.values():
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {lookup} "
+                "(id INTEGER PRIMARY KEY, code TEXT NOT NULL UNIQUE)"
+            )
+        fact_defs = ", ".join(
+            f"{quote_identifier(col)} {self._fact_type(col)}" for col in self.fact_columns
+        )
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {quote_identifier(self.fact_table)} ({fact_defs})"
+        )
+        self._create_view(conn)
+        self._load_lookups(conn)
+
+    def _create_view(self, conn: sqlite3.Connection):
+        """(Re)creates the view that exposes the original wide columns."""
+        select, joins = [], []
+        for col in self.columns:
+            if col in self._company_columns:
+                select.append(f"c.{quote_identifier(col)} AS {quote_identifier(col)}")
+            elif col in self._dictionaries:
+                alias = f"d_{col}"
+                lookup = self._dictionaries[col]
+                select.append(f"{alias}.code AS {quote_identifier(col)}")
+                joins.append(
+                    f"LEFT JOIN {lookup} AS {alias} "
+                    f"ON {alias}.id = f.{quote_identifier(self._id_column(col))}"
+                )
+            else:
+                select.append(f"f.{quote_identifier(col)} AS {quote_identifier(col)}")
+        if self._company_columns:
+            joins.insert(
+                0, f"LEFT JOIN {COMPANIES_TABLE} AS c ON c.id = f.{COMPANY_KEY}"
+            )
+
+        conn.execute(f"DROP VIEW IF EXISTS {quote_identifier(self.table_name)}")
+        conn.execute(
+            f"CREATE VIEW {quote_identifier(self.table_name)} AS SELECT "
+            + ", ".join(select)
+            + f" FROM {quote_identifier(self.fact_table)} AS f "
+            + " ".join(joins)
+        )
+
+    def _load_lookups(self, conn: sqlite3.Connection):
+        """Reads existing lookup rows, so upserts and resumed loads reuse their ids."""
+        for col, lookup in self._dictionaries.items():
+            self._codes[col] = dict(conn.execute(f"SELECT code, id FROM {lookup}"))
+            self._next_ids[col] = max(self._codes[col].values(), default=0) + 1
+        if self._company_columns:
+            columns = ", ".join(quote_identifier(col) for col in self._company_columns)
+            for row in conn.execute(f"SELECT id, {columns} FROM {COMPANIES_TABLE}"):
+                self._companies[self._company_values(row[1:])] = row[0]
+            self._next_company_id = max(self._companies.values(), default=0) + 1
+
+    def _company_values(self, values) -> tuple:
+        """Normalizes company attributes so CSV text and stored values compare equal."""
+        return tuple(
+            int(value) if col == "company_id" and value not in (None, "") else value
+            for col, value in zip(self._company_columns, values)
+        )
+
+    def to_fact_rows(self, conn: sqlite3.Connection, rows: list) -> list:
+        """
+        Converts a batch of wide rows into fact-table rows. New codes and new
+        companies are written to the lookup tables first.
+        """
+        company_value_indexes = [self._index[col] for col in self._company_columns]
+        new_companies = []
+        new_codes = {col: [] for col in self._dictionaries}
+        codes_by_column = self._codes
+        # (position in the wide row, column) for every non-company column.
+        fact_sources = [
+            (i, col)
+            for i, col in enumerate(self.columns)
+            if col not in self._company_columns
+        ]
+
+        fact_rows = []
+        for row in rows:
+            fact_row = []
+            if company_value_indexes:
+                raw = tuple([row[i] for i in company_value_indexes])
+                company_key = self._raw_companies.get(raw)
+                if company_key is None:
+                    values = self._company_values(raw)
+                    company_key = self._companies.get(values)
+                    if company_key is None:
+                        company_key = self._companies[values] = self._next_company_id
+                        self._next_company_id += 1
+                        new_companies.append((company_key, *values))
+                    self._raw_companies[raw] = company_key
+                fact_row.append(company_key)
+
+            for i, col in fact_sources:
+                value = row[i]
+                if value is None:
+                    pass
+                elif col in codes_by_column:
+                    codes = codes_by_column[col]
+                    code_id = codes.get(value)
+                    if code_id is None:
+                        code_id = codes[value] = self._next_ids[col]
+                        self._next_ids[col] += 1
+                        new_codes[col].append((code_id, value))
+                    value = code_id
+                fact_row.append(value)
+            fact_rows.append(fact_row)
+
+        for col, entries in new_codes.items():
+            if entries:
+                conn.executemany(
+                    f"INSERT INTO {self._dictionaries[col]} (id, code) VALUES (?, ?)",
+                    entries,
+                )
+        if new_companies:
+            columns = ", ".join(
+                ["id"] + [quote_identifier(col) for col in self._company_columns]
+            )
+            placeholders = ", ".join("?" for _ in range(len(self._company_columns) + 1))
+            conn.executemany(
+                f"INSERT INTO {COMPANIES_TABLE} ({columns}) VALUES ({placeholders})",
+                new_companies,
+            )
+        return fact_rows
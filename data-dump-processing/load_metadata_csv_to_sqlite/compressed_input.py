@@ -0,0 +1,160 @@
+"""
+Transparent, threaded decompression for data dump files.
+
+Dumps may arrive as plain files or compressed with gzip, bzip2, xz or zstd.
+`open_input` picks the codec from the file's magic bytes (not its extension)
+and returns a binary stream of the decompressed data. Decompression runs in a
+background thread, so it overlaps with parsing in the calling thread (zlib,
+bz2, lzma and zstandard all release the GIL while they work).
+
+This file is shared verbatim by the data-dump-processing examples so that
+each example folder stays self-contained.
+"""
+
+import bz2
+import gzip
+import io
+import lzma
+import queue
+import threading
+from pathlib import Path
+
+# Magic bytes at the start of each supported compressed format.
+MAGIC_BYTES = {
+    "gzip": b"\x1f\x8b",
+    "bz2": b"BZh",
+    "xz": b"\xfd7zXZ\x00",
+    "zstd": b"\x28\xb5\x2f\xfd",
+}
+# Size of the decompressed blocks handed from the background thread, and how
+# many of them may wait in the queue. This bounds the memory used for read-ahead.
+BLOCK_SIZE = 1024 * 1024
+QUEUED_BLOCKS = 8
+
+
+def detect_codec(path: Path):
+    """Returns the compression codec of a file from its magic bytes, or None."""
+    with open(path, "rb") as f:
+        header = f.read(6)
+    for codec, magic in MAGIC_BYTES.items():
+        if header.startswith(magic):
+            return codec
+    return None
+
+
+class _CountingReader:
+    """File wrapper that counts the (compressed) bytes read through it."""
+
+    def __init__(self, f):
+        self._f = f
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = self._f.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def close(self):
+        self._f.close()
+
+
+def _open_codec_stream(f, codec: str):
+    """Wraps a compressed binary file in a decompressing reader."""
+    if codec == "gzip":
+        return gzip.GzipFile(fileobj=f, mode="rb")
+    if codec == "bz2":
+        return bz2.BZ2File(f, mode="rb")
+    if codec == "xz":
+        return lzma.LZMAFile(f, mode="rb")
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "Reading .zst files requires the 'zstandard' package "
+            "(pip install zstandard)."
+        ) from None
+    # Dumps may be written as several concatenated zstd frames.
+    return zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+
+
+class ThreadedDecompressor(io.RawIOBase):
+    """Raw stream of decompressed bytes produced by a background thread."""
+
+    def __init__(self, path: Path, codec: str):
+        self._source = _CountingReader(open(path, "rb"))
+        self._stream = _open_codec_stream(self._source, codec)
+        self._blocks = queue.Queue(maxsize=QUEUED_BLOCKS)
+        self._stopped = threading.Event()
+        self._pending = memoryview(b"")
+        self._eof = False
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        """Puts an item on the queue unless the reader was closed meanwhile."""
+        while not self._stopped.is_set():
+            try:
+                self._blocks.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        try:
+            while True:
+                block = self._stream.read(BLOCK_SIZE)
+                if not self._put(block) or not block:
+                    return
+        except Exception as e:
+            self._put(e)
+
+    def compressed_position(self) -> int:
+        """Bytes of the compressed file consumed by the decompressor so far."""
+        return self._source.bytes_read
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if not self._pending:
+            if self._eof:
+                return 0
+            item = self._blocks.get()
+            if isinstance(item, Exception):
+                raise item
+            if not item:
+                self._eof = True
+                return 0
+            self._pending = memoryview(item)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self):
+        if not self.closed:
+            self._stopped.set()
+            self._thread.join()
+            self._stream.close()
+            self._source.close()
+        super().close()
+
+
+def open_input(path: Path):
+    """
+    Opens a plain or compressed dump file for binary reading.
+
+    Returns:
+        A tuple (stream, position, codec). `stream` is a buffered binary file
+        object of the decompressed data. `position()` returns how many bytes
+        of the file on disk have been consumed, for progress reporting.
+        `codec` is None for uncompressed files; only those are seekable.
+    """
+    codec = detect_codec(path)
+    if codec is None:
+        stream = open(path, "rb")
+        return stream, stream.tell, None
+
+    raw = ThreadedDecompressor(path, codec)
+    return io.BufferedReader(raw, buffer_size=BLOCK_SIZE), raw.compressed_position, codec
@@ -0,0 +1,367 @@
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from tqdm import tqdm
+
+from build_indexes import get_table_columns, quote_identifier
+
+# Configure logging for clear output
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+
+# --- Configuration ---
+# The name of the table created by load_to_sqlite.py.
+TABLE_NAME = "filings_metadata"
+# Markdown files written per transaction while indexing.
+FILES_PER_TRANSACTION = 500
+# Tokenizer of the FTS5 table: case-insensitive, accents folded ("é" matches "e").
+TOKENIZER = "unicode61 remove_diacritics 2"
+# Metadata columns shown with each search result, if the table has them.
+RESULT_COLUMNS = ("company_name", "filing_type_code", "release_date", "markdown_filename")
+# Tokens of context around the matches in each snippet.
+SNIPPET_TOKENS = 16
+
+
+def fts_table_names(table_name: str):
+    """Returns the names of the FTS5 table and its file-state side table."""
+    return f"{table_name}_fts", f"{table_name}_fts_files"
+
+
+def create_fts_tables(conn: sqlite3.Connection, table_name: str):
+    """
+    Creates the FTS5 table and a side table recording, for each indexed
+    filing, its file's size and modification time and the FTS5 rowid
+    (`docid`) of its current body.
+
+    The FTS5 table is contentless (content=''): it stores the index but not
+    a copy of the text. Rows of a contentless table cannot be deleted, so a
+    changed file is indexed under a new docid, and searches skip every row
+    that is not a filing's current docid.
+    """
+    fts_table, files_table = fts_table_names(table_name)
+    conn.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {quote_identifier(fts_table)} "
+        f"USING fts5(body, content = '', tokenize = '{TOKENIZER}')"
+    )
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {quote_identifier(files_table)} ("
+        "id INTEGER PRIMARY KEY, docid INTEGER UNIQUE, markdown_filename TEXT, "
+        "size INTEGER, mtime REAL, indexed_at TEXT)"
+    )
+    conn.commit()
+
+
+def index_markdown(
+    db_path: Path,
+    markdown_dir: Path,
+    table_name: str = TABLE_NAME,
+    show_progress: bool = True,
+) -> dict:
+    """
+    Adds the markdown bodies of the filings in `table_name` to the FTS5 index.
+
+    Files are read one at a time and written in batched transactions. Filings
+    whose file is unchanged since the last run (same size and modification
+    time) are skipped, so re-running after a delta load only indexes the new
+    and changed files. Filings that are no longer in `table_name` are removed
+    from the search results.
+
+    Returns:
+        A dict with the counts 'indexed', 'unchanged', 'missing' and 'removed'.
+    """
+    if not Path(db_path).exists():
+        logging.error(f"Database not found: {db_path}")
+        sys.exit(1)
+    if not Path(markdown_dir).is_dir():
+        logging.error(f"Markdown directory not found: {markdown_dir}")
+        sys.exit(1)
+
+    fts_table, files_table = fts_table_names(table_name)
+    stats = {"indexed": 0, "unchanged": 0, "missing": 0, "removed": 0}
+    start_time = time.time()
+
+    conn = sqlite3.connect(db_path)
+    try:
+        columns = get_table_columns(conn, table_name)
+        if "markdown_filename" not in columns:
+            logging.error(
+                f"Table '{table_name}' in '{db_path}' has no markdown_filename column."
+            )
+            sys.exit(1)
+        create_fts_tables(conn, table_name)
+        (last_docid,) = conn.execute(
+            f"SELECT COALESCE(MAX(rowid), 0) FROM {quote_identifier(fts_table)}"
+        ).fetchone()
+
+        indexed_files = {
+            row[0]: (row[1], row[2])
+            for row in conn.execute(
+                f"SELECT id, size, mtime FROM {quote_identifier(files_table)}"
+            )
+        }
+        filings = conn.execute(
+            f"SELECT id, markdown_filename FROM {quote_identifier(table_name)} "
+            "WHERE markdown_filename IS NOT NULL"
+        ).fetchall()
+        logging.info(
+            f"Indexing markdown for {len(filings):,} filings from '{markdown_dir}'..."
+        )
+
+        pending = 0
+        for filing_id, filename in tqdm(
+            filings, desc="Indexing", unit="files", disable=not show_progress
+        ):
+            path = Path(markdown_dir) / filename
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stats["missing"] += 1
+                continue
+            if indexed_files.get(filing_id) == (stat.st_size, stat.st_mtime):
+                stats["unchanged"] += 1
+                continue
+
+            body = path.read_text(encoding="utf-8", errors="replace")
+            last_docid += 1
+            conn.execute(
+                f"INSERT INTO {quote_identifier(fts_table)} (rowid, body) VALUES (?, ?)",
+                (last_docid, body),
+            )
+            conn.execute(
+                f"INSERT OR REPLACE INTO {quote_identifier(files_table)} "
+                "(id, docid, markdown_filename, size, mtime, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, datetime('now'))",
+                (filing_id, last_docid, filename, stat.st_size, stat.st_mtime),
+            )
+            stats["indexed"] += 1
+            pending += 1
+            if pending >= FILES_PER_TRANSACTION:
+                conn.commit()
+                pending = 0
+        conn.commit()
+
+        # Drop filings that were removed from the metadata table. Their rows
+        # stay in the FTS5 table, but no longer match a current docid.
+        stale = [
+            (filing_id,)
+            for filing_id in indexed_files.keys()
+            - {filing_id for filing_id, _ in filings}
+        ]
+        conn.executemany(
+            f"DELETE FROM {quote_identifier(files_table)} WHERE id = ?", stale
+        )
+        conn.commit()
+        stats["removed"] = len(stale)
+    except sqlite3.Error as e:
+        logging.error(f"SQLite error while indexing '{db_path}': {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    logging.info(
+        f"Indexed {stats['indexed']:,} files, skipped {stats['unchanged']:,} "
+        f"unchanged, {stats['missing']:,} missing, removed {stats['removed']:,} "
+        f"in {time.time() - start_time:.2f} seconds."
+    )
+    return stats
+
+
+def optimize_index(db_path: Path, table_name: str = TABLE_NAME):
+    """Merges the FTS5 index segments into one, which speeds up queries."""
+    fts_table, _ = fts_table_names(table_name)
+    start = time.time()
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(
+            f"INSERT INTO {quote_identifier(fts_table)} "
+            f"({quote_identifier(fts_table)}) VALUES ('optimize')"
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    logging.info(f"Optimized the full-text index in {time.time() - start:.2f} seconds.")
+
+
+def search(
+    db_path: Path,
+    query: str,
+    table_name: str = TABLE_NAME,
+    limit: int = 10,
+    markdown_dir: Path = None,
+) -> list:
+    """
+    Runs an FTS5 query and returns the best-ranked filings.
+
+    `query` uses the FTS5 syntax: words, "quoted phrases", AND / OR / NOT,
+    NEAR(...) and prefix* terms. Results are ordered by BM25 relevance.
+
+    The index holds no copy of the text, so snippets are cut from the
+    markdown files of the results, and only if `markdown_dir` is given.
+
+    Returns:
+        A list of dicts with the filing id, its metadata columns, the BM25
+        score (lower is better) and a snippet with the matches in [brackets]
+        (None without `markdown_dir`, or if the file cannot be read).
+    """
+    fts_table, files_table = fts_table_names(table_name)
+    fts = quote_identifier(fts_table)
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        columns = [
+            col for col in RESULT_COLUMNS if col in get_table_columns(conn, table_name)
+        ]
+        select = "".join(f", m.{quote_identifier(col)}" for col in columns)
+        # Rank and limit inside the FTS5 query, counting only current docids,
+        # then join the metadata of the top rows.
+        rows = conn.execute(
+            f"SELECT hits.id{select}, hits.score, hits.markdown_file FROM ("
+            f"  SELECT f.id, f.markdown_filename AS markdown_file, {fts}.rank AS score "
+            f"  FROM {fts} JOIN {quote_identifier(files_table)} AS f "
+            f"  ON f.docid = {fts}.rowid "
+            f"  WHERE {fts} MATCH ? ORDER BY {fts}.rank LIMIT ?"
+            f") AS hits "
+            f"JOIN {quote_identifier(table_name)} AS m ON m.id = hits.id "
+            "ORDER BY hits.score",
+            (query, limit),
+        ).fetchall()
+        results = [dict(row) for row in rows]
+        snippets = cut_snippets(conn, query, results, markdown_dir) if markdown_dir else {}
+    finally:
+        conn.close()
+    for result in results:
+        result.pop("markdown_file")
+        result["snippet"] = snippets.get(result["id"])
+    return results
+
+
+def cut_snippets(conn: sqlite3.Connection, query: str, results: list, markdown_dir: Path) -> dict:
+    """
+    Returns {filing id: snippet} for the results. Their files are indexed in
+    a temporary FTS5 table with content, and the same query is run on it, so
+    the snippets mark the same matches as the search.
+    """
+    conn.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS temp.snippet_bodies "
+        f"USING fts5(body, tokenize = '{TOKENIZER}')"
+    )
+    conn.execute("DELETE FROM temp.snippet_bodies")
+    for result in results:
+        try:
+            body = (Path(markdown_dir) / result["markdown_file"]).read_text(
+                encoding="utf-8", errors="replace"
+            )
+        except OSError:
+            continue
+        conn.execute(
+            "INSERT INTO temp.snippet_bodies (rowid, body) VALUES (?, ?)",
+            (result["id"], body),
+        )
+    return dict(
+        conn.execute(
+            "SELECT rowid, snippet(snippet_bodies, 0, '[', ']', '…', "
+            f"{SNIPPET_TOKENS}) FROM temp.snippet_bodies WHERE snippet_bodies MATCH ?",
+            (query,),
+        )
+    )
+
+
+def print_results(results: list, query: str, duration: float):
+    """Prints search results in a readable form."""
+    print(f"\n--- {len(results)} result(s) for {query!r} ({duration * 1000:.1f} ms) ---")
+    for rank, result in enumerate(results, start=1):
+        details = " | ".join(
+            str(result[col]) for col in RESULT_COLUMNS if col in result
+        )
+        print(f"\n{rank}. [{result['id']}] {details} (score {result['score']:.2f})")
+        if result["snippet"]:
+            print(f"   {' '.join(result['snippet'].split())}")
+
+
+def main():
+    """Main function to parse arguments and index or search the markdown."""
+    parser = argparse.ArgumentParser(
+        description="Build and query an SQLite FTS5 full-text index over the "
+        "markdown files of a FinancialReports data dump.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--db-name",
+        type=Path,
+        default="financialreports.db",
+        help="Path to the SQLite database created by load_to_sqlite.py.",
+    )
+    parser.add_argument(
+        "--table-name",
+        type=str,
+        default=TABLE_NAME,
+        help="Name of the metadata table.",
+    )
+    parser.add_argument(
+        "--markdown-dir",
+        type=Path,
+        help="Directory containing the dump's markdown files. Adds new and "
+        "changed files to the index, and shows a snippet with each search result.",
+    )
+    parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help="Merge the index segments after indexing (slower to build, faster to query).",
+    )
+    parser.add_argument(
+        "--search",
+        type=str,
+        help='FTS5 query, e.g. \'"going concern" AND NOT audit*\'.',
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=10,
+        help="Maximum number of search results.",
+    )
+    parser.add_argument(
+        "--no-progress",
+        action="store_true",
+        help="Do not display a progress bar while indexing.",
+    )
+    args = parser.parse_args()
+
+    if not (args.markdown_dir or args.search or args.optimize):
+        parser.error("Nothing to do: pass --markdown-dir, --optimize and/or --search.")
+
+    if args.markdown_dir:
+        index_markdown(
+            args.db_name, args.markdown_dir, args.table_name, not args.no_progress
+        )
+    elif not args.db_name.exists():
+        # sqlite3.connect would create an empty database file.
+        logging.error(f"Database not found: {args.db_name}")
+        sys.exit(1)
+    if args.optimize:
+        try:
+            optimize_index(args.db_name, args.table_name)
+        except sqlite3.OperationalError as e:
+            logging.error(f"Optimize failed (build the index with --markdown-dir first): {e}")
+            sys.exit(1)
+    if args.search:
+        start = time.perf_counter()
+        try:
+            results = search(
+                args.db_name, args.search, args.table_name, args.limit, args.markdown_dir
+            )
+        except sqlite3.OperationalError as e:
+            logging.error(f"Search failed: {e}")
+            sys.exit(1)
+        print_results(results, args.search, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
 import argparse
+import csv
+import io
 import logging
+import multiprocessing
+import os
+import re
 import sqlite3
 import sys
 import time
@@ -10,6 +15,15 @@ from sqlalchemy import create_engine
 from sqlalchemy.exc import SQLAlchemyError
 from tqdm import tqdm
 
+from build_indexes import (
+    INDEX_DEFINITIONS,
+    index_database,
+    parse_index_names,
+    quote_identifier,
+)
+from compact_schema import CompactSchema, drop_table_or_view
+from compressed_input import detect_codec, open_input
+
 # Configure logging for clear output
 logging.basicConfig(
     level=logging.INFO,
@@ -22,6 +36,51 @@ logging.basicConfig(
 CHUNK_SIZE = 10000
 # The name of the table to be created in the SQLite database.
 TABLE_NAME = "filings_metadata"
+# Number of rows sent to SQLite per `executemany` call by the native engine.
+BATCH_SIZE = 50000
+
+# Parallel mode: the CSV body is split into byte ranges of about this size,
+# and each parser worker may have this many parsed batches waiting for the writer.
+RANGE_BYTES = 16 * 1024 * 1024
+QUEUED_BATCHES_PER_WORKER = 2
+# Block size used when scanning the CSV body for record boundaries.
+SCAN_BYTES = 1024 * 1024
+QUOTE_OR_NEWLINE_RE = re.compile(rb'["\n]')
+
+# Column that identifies a filing. Upserts and resumable loads are keyed on it.
+KEY_COLUMN = "id"
+# Journal modes in which SQLite cannot roll back a transaction. Loads that
+# depend on ROLLBACK (upsert, intermediate commits, resume) reject them.
+ROLLBACK_FREE_JOURNAL_MODES = ("OFF",)
+
+# Side tables holding resume checkpoints and per-run load statistics.
+CHECKPOINT_TABLE = "load_checkpoints"
+RUNS_TABLE = "load_runs"
+
+# Explicit column types used by the native engine instead of letting pandas
+# infer them. Columns that are not listed here are stored as TEXT.
+METADATA_SCHEMA = {
+    "id": "INTEGER PRIMARY KEY",
+    "company_id": "INTEGER",
+    "company_name": "TEXT",
+    "isin": "TEXT",
+    "lei": "TEXT",
+    "filing_type_code": "TEXT",
+    "release_date": "TEXT",
+    "language_code": "TEXT",
+    "markdown_filename": "TEXT",
+}
+
+# PRAGMAs applied by the native engine for the duration of the load.
+# The rollback journal is kept in memory, so a failed load can still be rolled
+# back, and fsyncs are switched off because a crashed load is simply re-run;
+# every value can be overridden from the command line.
+DEFAULT_PRAGMAS = {
+    "journal_mode": "MEMORY",
+    "synchronous": "OFF",
+    "cache_size": -262144,  # Negative values are KiB, i.e. 256 MiB.
+    "page_size": 16384,
+}
 
 
 def create_sqlite_engine(db_path: Path):
@@ -36,19 +95,88 @@ def create_sqlite_engine(db_path: Path):
 
 
 def validate_input_file(file_path: Path):
-    """Validates that the input file exists and is a .csv file."""
+    """Validates that the input file exists and is a (possibly compressed) .csv file."""
     if not file_path.exists():
         logging.error(f"Input file not found: {file_path}")
         sys.exit(1)
-    if file_path.suffix.lower() != ".csv":
+    if ".csv" not in [suffix.lower() for suffix in file_path.suffixes]:
         logging.warning(
             f"Input file '{file_path}' is not a .csv file. "
             "Attempting to process anyway."
         )
 
 
+def build_create_table_sql(table_name: str, columns: list) -> str:
+    """Builds a CREATE TABLE statement using the explicit METADATA_SCHEMA types."""
+    column_defs = ", ".join(
+        f"{quote_identifier(col)} {METADATA_SCHEMA.get(col, 'TEXT')}"
+        for col in columns
+    )
+    return f"CREATE TABLE IF NOT EXISTS {quote_identifier(table_name)} ({column_defs})"
+
+
+def build_insert_sql(table_name: str, columns: list, mode: str) -> str:
+    """
+    Builds the prepared INSERT statement for the native engine.
+
+    In 'upsert' mode, rows whose KEY_COLUMN already exists are updated, but only
+    when at least one column actually differs, so unchanged rows are not written.
+    """
+    column_list = ", ".join(quote_identifier(col) for col in columns)
+    placeholders = ", ".join("?" for _ in columns)
+    sql = (
+        f"INSERT INTO {quote_identifier(table_name)} ({column_list}) "
+        f"VALUES ({placeholders})"
+    )
+    if mode == "upsert":
+        value_columns = [col for col in columns if col != KEY_COLUMN]
+        assignments = ", ".join(
+            f"{quote_identifier(col)} = excluded.{quote_identifier(col)}"
+            for col in value_columns
+        )
+        changed = " OR ".join(
+            f"{quote_identifier(col)} IS NOT excluded.{quote_identifier(col)}"
+            for col in value_columns
+        )
+        sql += (
+            f" ON CONFLICT({quote_identifier(KEY_COLUMN)}) "
+            f"DO UPDATE SET {assignments} WHERE {changed}"
+        )
+    return sql
+
+
+def apply_pragmas(conn: sqlite3.Connection, pragmas: dict):
+    """Applies PRAGMA settings to an open SQLite connection."""
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name}={value}")
+        logging.info(f"PRAGMA {name}={value}")
+
+
+def log_load_summary(
+    total_rows: int, total_bytes: int, duration: float, codec: str = None
+):
+    """
+    Logs the row count, elapsed time and throughput of a finished load.
+    `total_bytes` counts the file on disk, so for compressed input (`codec`
+    set) the MB/s are labeled as compressed.
+    """
+    duration = max(duration, 1e-9)
+    compressed = f" of {codec}-compressed input" if codec else ""
+    logging.info(
+        f"Successfully processed {total_rows:,} rows in {duration:.2f} seconds."
+    )
+    logging.info(
+        f"Throughput: {total_bytes / 1e6 / duration:,.1f} MB/s{compressed}, "
+        f"{total_rows / duration:,.0f} rows/s ({total_bytes / 1e6:,.1f} MB{compressed} read)."
+    )
+
+
 def load_csv_to_sqlite(
-    csv_path: Path, engine, table_name: str, chunk_size: int
+    csv_path: Path,
+    engine,
+    table_name: str,
+    chunk_size: int,
+    show_progress: bool = True,
 ) -> int:
     """
     Loads data from a CSV file into a SQLite database table in chunks.
@@ -58,6 +186,7 @@ def load_csv_to_sqlite(
         engine: The SQLAlchemy engine instance.
         table_name: The name of the database table.
         chunk_size: The number of rows to process per chunk.
+        show_progress: Show a progress bar based on the reader's byte position.
 
     Returns:
         The total number of rows processed.
@@ -71,18 +200,21 @@ def load_csv_to_sqlite(
     logging.info(f"Target table: '{table_name}' in '{engine.url.database}'.")
 
     try:
-        # Use tqdm to create a progress bar by iterating over the CSV in chunks.
-        with pd.read_csv(
-            csv_path, chunksize=chunk_size, iterator=True
+        # Read through our own (decompressing) binary stream so the progress bar
+        # can follow the position in the file instead of counting rows up front.
+        stream, position, codec = open_input(csv_path)
+        if codec:
+            logging.info(f"Decompressing {codec} input on a background thread.")
+        with stream, pd.read_csv(
+            stream, chunksize=chunk_size, iterator=True
         ) as reader:
-            # Get total number of rows for tqdm progress bar if possible
-            # This might be slow for very large files, but provides great UX.
-            try:
-                row_count = sum(1 for row in open(csv_path, 'r')) -1 # -1 for header
-                pbar = tqdm(total=row_count, unit="rows", ncols=80)
-            except Exception:
-                pbar = tqdm(unit="rows", ncols=80)
-
+            pbar = tqdm(
+                total=csv_path.stat().st_size,
+                unit="B",
+                unit_scale=True,
+                ncols=80,
+                disable=not show_progress,
+            )
 
             for chunk in reader:
                 chunk.to_sql(
@@ -94,8 +226,9 @@ def load_csv_to_sqlite(
                 # After the first chunk, append to the now-existing table.
                 if_exists_action = "append"
                 total_rows += len(chunk)
-                pbar.update(len(chunk))
-            
+                pbar.update(position() - pbar.n)
+
+            total_bytes = position()
             pbar.close()
 
     except FileNotFoundError:
@@ -111,8 +244,524 @@ def load_csv_to_sqlite(
     end_time = time.time()
     duration = end_time - start_time
 
+    log_load_summary(total_rows, total_bytes, duration, codec)
+    return total_rows
+
+
+def iter_csv_batches(position, reader, batch_size: int):
+    """
+    Yields (rows, bytes_read, byte_offset) batches from a sequential CSV reader.
+    `position()` returns the reader's current offset in the file on disk;
+    bytes_read is the input consumed by the batch and byte_offset is the
+    position just after its last row.
+    """
+    previous = position()
+    batch = []
+    for row in reader:
+        # Empty fields become NULL, matching what pandas writes for NaN.
+        batch.append([value if value != "" else None for value in row])
+        if len(batch) >= batch_size:
+            offset = position()
+            yield batch, offset - previous, offset
+            previous = offset
+            batch = []
+    if batch:
+        offset = position()
+        yield batch, offset - previous, offset
+
+
+def split_byte_ranges(csv_path: Path, data_start: int, parts: int) -> list:
+    """
+    Splits the CSV body (everything after the header) into about `parts`
+    byte ranges whose boundaries fall on record starts.
+
+    Quoted fields may contain line breaks, so a boundary is only placed after
+    a newline that is outside quotes. CSV escapes a quote inside a quoted
+    field by doubling it, so a position is inside quotes exactly when an odd
+    number of quote characters precede it. The quotes are counted over the
+    whole body, which reads the file once at disk speed.
+    """
+    size = csv_path.stat().st_size
+    step = max(1, (size - data_start) // parts)
+    boundaries = [data_start]
+    inside_quotes = False
+    with open(csv_path, "rb") as f:
+        f.seek(data_start)
+        position = data_start
+        next_split = data_start + step
+        while position < size:
+            block = f.read(SCAN_BYTES)
+            if not block:
+                break
+            offset = 0
+            while True:
+                split_at = next_split - position
+                if split_at >= len(block):
+                    # No split point left in this block: only track the quotes.
+                    inside_quotes ^= block.count(b'"', offset) % 2 == 1
+                    break
+                inside_quotes ^= block.count(b'"', offset, split_at) % 2 == 1
+                for match in QUOTE_OR_NEWLINE_RE.finditer(block, split_at):
+                    if match.group() == b'"':
+                        inside_quotes = not inside_quotes
+                    elif not inside_quotes:
+                        boundary = position + match.end()
+                        if boundary < size:
+                            boundaries.append(boundary)
+                        next_split = boundary + step
+                        offset = match.end()
+                        break
+                else:
+                    # The scan reached the end of the block inside a quoted field.
+                    next_split = position + len(block)
+                    break
+            position += len(block)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def to_integer(value: str):
+    """Converts an INTEGER column value, keeping anything non-numeric as text."""
+    try:
+        return int(value)
+    except ValueError:
+        return value
+
+
+def parse_range_worker(
+    csv_path: Path, column_types: list, batch_size: int, tasks, results
+):
+    """
+    Worker process: parses and type-converts byte ranges taken from `tasks`
+    and puts (rows, bytes_read) batches on the bounded `results` queue. The last
+    batch of each range carries the range size. Puts None when done, or an
+    error message string if parsing fails.
+    """
+    converters = [
+        to_integer if col_type.startswith("INTEGER") else None
+        for col_type in column_types
+    ]
+    try:
+        with open(csv_path, "rb") as f:
+            for start, end in iter(tasks.get, None):
+                f.seek(start)
+                text = f.read(end - start).decode("utf-8")
+                batch = []
+                for row in csv.reader(io.StringIO(text)):
+                    batch.append(
+                        [
+                            None if value == "" else convert(value) if convert else value
+                            for value, convert in zip(row, converters)
+                        ]
+                    )
+                    if len(batch) >= batch_size:
+                        results.put((batch, 0))
+                        batch = []
+                results.put((batch, end - start))
+    except Exception as e:
+        results.put(f"{type(e).__name__}: {e}")
+    results.put(None)
+
+
+def iter_parallel_batches(
+    csv_path: Path, data_start: int, columns: list, batch_size: int, workers: int
+):
+    """
+    Yields (rows, bytes_read, None) batches parsed by `workers` processes.
+
+    Workers parse byte ranges of the file and feed this (single writer) process
+    through a bounded queue, so parsing uses all cores while SQLite keeps a
+    single writer. Batches arrive in completion order, not file order.
+    """
+    size = csv_path.stat().st_size
+    parts = max(workers * 4, (size - data_start) // RANGE_BYTES)
+    ranges = split_byte_ranges(csv_path, data_start, parts)
+    column_types = [METADATA_SCHEMA.get(col, "TEXT") for col in columns]
+
+    tasks = multiprocessing.Queue()
+    results = multiprocessing.Queue(maxsize=workers * QUEUED_BATCHES_PER_WORKER)
+    for byte_range in ranges:
+        tasks.put(byte_range)
+    for _ in range(workers):
+        tasks.put(None)
+
+    processes = [
+        multiprocessing.Process(
+            target=parse_range_worker,
+            args=(csv_path, column_types, batch_size, tasks, results),
+            daemon=True,
+        )
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
     logging.info(
-        f"Successfully processed {total_rows:,} rows in {duration:.2f} seconds."
+        f"Started {workers} parser workers over {len(ranges):,} byte ranges."
+    )
+
+    try:
+        finished = 0
+        while finished < workers:
+            item = results.get()
+            if item is None:
+                finished += 1
+            elif isinstance(item, str):
+                raise RuntimeError(f"Parser worker failed: {item}")
+            else:
+                yield item[0], item[1], None
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+
+
+def create_side_tables(conn: sqlite3.Connection):
+    """Creates the checkpoint and run-statistics tables if they do not exist."""
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+            table_name TEXT NOT NULL,
+            source_path TEXT NOT NULL,
+            source_size INTEGER NOT NULL,
+            source_mtime REAL NOT NULL,
+            byte_offset INTEGER NOT NULL,
+            rows_committed INTEGER NOT NULL,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (table_name, source_path)
+        )
+        """
+    )
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {RUNS_TABLE} (
+            run_id INTEGER PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            source_path TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            status TEXT NOT NULL,
+            started_at TEXT NOT NULL,
+            finished_at TEXT,
+            resumed_from_offset INTEGER NOT NULL DEFAULT 0,
+            rows_read INTEGER NOT NULL DEFAULT 0,
+            rows_inserted INTEGER NOT NULL DEFAULT 0,
+            rows_updated INTEGER NOT NULL DEFAULT 0,
+            rows_unchanged INTEGER NOT NULL DEFAULT 0,
+            duration_seconds REAL
+        )
+        """
+    )
+
+
+def read_checkpoint(
+    conn: sqlite3.Connection, table_name: str, csv_path: Path
+) -> tuple:
+    """
+    Returns the (byte_offset, rows_committed) of the last committed batch for
+    this file, or (0, 0) if there is none or the file changed since then.
+    """
+    row = conn.execute(
+        f"SELECT source_size, source_mtime, byte_offset, rows_committed "
+        f"FROM {CHECKPOINT_TABLE} WHERE table_name = ? AND source_path = ?",
+        (table_name, str(csv_path.resolve())),
+    ).fetchone()
+    if row is None:
+        return 0, 0
+
+    stat = csv_path.stat()
+    if row[0] != stat.st_size or row[1] != stat.st_mtime:
+        logging.warning(
+            f"'{csv_path}' changed since the last checkpoint. Starting from the top."
+        )
+        return 0, 0
+    return row[2], row[3]
+
+
+def write_checkpoint(
+    conn: sqlite3.Connection,
+    table_name: str,
+    csv_path: Path,
+    byte_offset: int,
+    rows_committed: int,
+):
+    """Records the position of the last row of the current transaction."""
+    stat = csv_path.stat()
+    conn.execute(
+        f"INSERT OR REPLACE INTO {CHECKPOINT_TABLE} VALUES "
+        "(?, ?, ?, ?, ?, ?, datetime('now'))",
+        (
+            table_name,
+            str(csv_path.resolve()),
+            stat.st_size,
+            stat.st_mtime,
+            byte_offset,
+            rows_committed,
+        ),
+    )
+
+
+def clear_checkpoint(conn: sqlite3.Connection, table_name: str, csv_path: Path):
+    """Removes the checkpoint once a file has been loaded completely."""
+    conn.execute(
+        f"DELETE FROM {CHECKPOINT_TABLE} WHERE table_name = ? AND source_path = ?",
+        (table_name, str(csv_path.resolve())),
+    )
+
+
+def mark_run_failed(
+    conn: sqlite3.Connection, run_id: int, rows_read: int, resumable: bool
+):
+    """
+    Rolls back the open transaction and records the run as failed. Pass
+    `resumable` only if checkpoints were written, i.e. the load committed in
+    steps from uncompressed input.
+    """
+    if conn.in_transaction:
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if journal_mode.upper() in ROLLBACK_FREE_JOURNAL_MODES:
+            # Without a journal, ROLLBACK is undefined; keep what was written.
+            conn.execute("COMMIT")
+            logging.error(
+                "journal_mode=OFF cannot roll back: the table holds a partial "
+                "load. Re-run the load."
+            )
+        else:
+            conn.execute("ROLLBACK")
+    if run_id is not None:
+        conn.execute(
+            f"UPDATE {RUNS_TABLE} SET status = 'failed', "
+            "finished_at = datetime('now'), rows_read = ? WHERE run_id = ?",
+            (rows_read, run_id),
+        )
+    if resumable:
+        logging.error("Rows up to the last commit are kept; use --resume to continue.")
+
+
+def count_rows(conn: sqlite3.Connection, table_name: str) -> int:
+    """Returns the number of rows in a table."""
+    return conn.execute(
+        f"SELECT COUNT(*) FROM {quote_identifier(table_name)}"
+    ).fetchone()[0]
+
+
+def load_csv_to_sqlite_native(
+    csv_path: Path,
+    db_path: Path,
+    table_name: str,
+    batch_size: int,
+    pragmas: dict,
+    mode: str = "replace",
+    commit_every: int = 0,
+    resume: bool = False,
+    workers: int = 1,
+    show_progress: bool = True,
+    schema: str = "wide",
+) -> int:
+    """
+    Loads data from a CSV file into SQLite using the standard library only.
+
+    Unlike `load_csv_to_sqlite`, rows are inserted with a prepared `executemany`
+    statement in batches, the table is created from METADATA_SCHEMA, and the
+    given PRAGMAs are applied before any data is written. By default the whole
+    load runs in a single transaction.
+
+    Args:
+        csv_path: Path to the input CSV file.
+        db_path: Path to the SQLite database file.
+        table_name: The name of the database table.
+        batch_size: The number of rows per `executemany` call.
+        pragmas: PRAGMA names and values to apply for the load.
+        mode: 'replace' recreates the table; 'upsert' inserts new rows and
+            updates changed rows, keyed on KEY_COLUMN.
+        commit_every: Commit (and checkpoint) after roughly this many rows.
+            0 loads everything in one transaction.
+        resume: Continue from the last checkpoint of an interrupted load.
+        workers: Number of parser processes. With more than one, parsing runs
+            in parallel and this process only writes; checkpoints are not
+            available in this mode.
+        show_progress: Show a progress bar based on the reader's byte position.
+        schema: 'wide' stores the CSV columns as they are. 'compact' stores
+            companies and codes in lookup tables and exposes them through a
+            view named `table_name` (see compact_schema.py).
+
+    Returns:
+        The total number of rows processed.
+    """
+    total_rows = 0
+    total_bytes = 0
+    rows_written = 0
+    resumable = False
+    start_time = time.time()
+
+    logging.info(f"Starting to process '{csv_path}' with the native engine...")
+    logging.info(f"Target table: '{table_name}' in '{db_path}' (mode: {mode}).")
+
+    journal_mode = str(pragmas.get("journal_mode")).upper()
+    if journal_mode in ROLLBACK_FREE_JOURNAL_MODES and (
+        mode == "upsert" or commit_every or resume
+    ):
+        raise ValueError(
+            f"journal_mode={journal_mode} cannot roll back a failed transaction; "
+            "use MEMORY, DELETE or WAL with upsert, commit_every or resume."
+        )
+    if commit_every and journal_mode == "MEMORY":
+        logging.warning(
+            "With an in-memory journal, a process killed during a commit can "
+            "corrupt the database. Consider --journal-mode WAL for resumable loads."
+        )
+
+    # isolation_level=None lets us control the transactions explicitly.
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    run_id = None
+    try:
+        apply_pragmas(conn, pragmas)
+        create_side_tables(conn)
+
+        # Read in binary mode so the reader's byte position can be checkpointed.
+        stream, position, codec = open_input(csv_path)
+        if codec:
+            logging.info(f"Decompressing {codec} input on a background thread.")
+        # Offsets into compressed input cannot be resumed from.
+        resumable = bool(commit_every) and codec is None
+        with stream as f:
+            reader = csv.reader(line.decode("utf-8") for line in f)
+            try:
+                columns = next(reader)
+            except StopIteration:
+                logging.error(f"Error: The file '{csv_path}' is empty.")
+                sys.exit(1)
+            if mode == "upsert" and KEY_COLUMN not in columns:
+                logging.error(
+                    f"Upsert mode needs a '{KEY_COLUMN}' column in '{csv_path}'."
+                )
+                sys.exit(1)
+
+            start_offset, rows_before = (
+                read_checkpoint(conn, table_name, csv_path) if resume else (0, 0)
+            )
+            run_id = conn.execute(
+                f"INSERT INTO {RUNS_TABLE} (table_name, source_path, mode, status, "
+                "started_at, resumed_from_offset) "
+                "VALUES (?, ?, ?, 'running', datetime('now'), ?)",
+                (table_name, str(csv_path), mode, start_offset),
+            ).lastrowid
+
+            conn.execute("BEGIN")
+            if start_offset:
+                logging.info(
+                    f"Resuming after {rows_before:,} committed rows "
+                    f"(byte offset {start_offset:,})."
+                )
+                f.seek(start_offset)
+            replace = mode == "replace" and not start_offset
+
+            # Rows are written to target_table; for the compact schema that is
+            # the fact table behind the `table_name` view.
+            compact = None
+            if schema == "compact":
+                compact = CompactSchema(table_name, columns)
+                compact.create(conn, replace)
+                target_table, target_columns = compact.fact_table, compact.fact_columns
+            else:
+                if replace:
+                    drop_table_or_view(conn, table_name)
+                conn.execute(build_create_table_sql(table_name, columns))
+                target_table, target_columns = table_name, columns
+            if mode == "upsert":
+                # Tables created by the pandas engine have no key constraint.
+                conn.execute(
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS "
+                    f"{quote_identifier(f'uq_{target_table}_{KEY_COLUMN}')} "
+                    f"ON {quote_identifier(target_table)} ({quote_identifier(KEY_COLUMN)})"
+                )
+            table_rows_before = count_rows(conn, target_table)
+
+            if workers > 1:
+                batches = iter_parallel_batches(
+                    csv_path, f.tell(), columns, batch_size, workers
+                )
+            else:
+                batches = iter_csv_batches(position, reader, batch_size)
+
+            insert_sql = build_insert_sql(target_table, target_columns, mode)
+            pbar = tqdm(
+                total=csv_path.stat().st_size,
+                initial=position(),
+                unit="B",
+                unit_scale=True,
+                ncols=80,
+                disable=not show_progress,
+            )
+            rows_since_commit = 0
+            for batch, bytes_read, byte_offset in batches:
+                total_rows += len(batch)
+                if compact:
+                    batch = compact.to_fact_rows(conn, batch)
+                rows_written += conn.executemany(insert_sql, batch).rowcount
+                total_bytes += bytes_read
+                rows_since_commit += len(batch)
+                pbar.update(bytes_read)
+                if commit_every and rows_since_commit >= commit_every:
+                    # The checkpoint is part of the transaction it describes.
+                    if resumable:
+                        write_checkpoint(
+                            conn,
+                            table_name,
+                            csv_path,
+                            byte_offset,
+                            rows_before + total_rows,
+                        )
+                    conn.execute("COMMIT")
+                    conn.execute("BEGIN")
+                    rows_since_commit = 0
+            pbar.close()
+            if codec:
+                # The decompressor reads ahead of the batches, so their byte
+                # counts miss its first blocks; count all input consumed.
+                total_bytes = position()
+
+            rows_inserted = count_rows(conn, target_table) - table_rows_before
+            clear_checkpoint(conn, table_name, csv_path)
+            conn.execute("COMMIT")
+
+        duration = time.time() - start_time
+        conn.execute(
+            f"UPDATE {RUNS_TABLE} SET status = 'completed', "
+            "finished_at = datetime('now'), rows_read = ?, rows_inserted = ?, "
+            "rows_updated = ?, rows_unchanged = ?, duration_seconds = ? "
+            "WHERE run_id = ?",
+            (
+                total_rows,
+                rows_inserted,
+                rows_written - rows_inserted,
+                total_rows - rows_written,
+                duration,
+                run_id,
+            ),
+        )
+
+    except FileNotFoundError:
+        logging.error(f"Error: The file '{csv_path}' was not found.")
+        sys.exit(1)
+    except sqlite3.Error as e:
+        mark_run_failed(conn, run_id, total_rows, resumable)
+        logging.error(f"SQLite error while loading '{csv_path}': {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        mark_run_failed(conn, run_id, total_rows, resumable)
+        logging.error("Load interrupted.")
+        sys.exit(130)
+    except Exception as e:
+        mark_run_failed(conn, run_id, total_rows, resumable)
+        logging.error(f"An unexpected error occurred: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    log_load_summary(total_rows, total_bytes, duration, codec)
+    logging.info(
+        f"Inserted {rows_inserted:,}, updated {rows_written - rows_inserted:,}, "
+        f"unchanged {total_rows - rows_written:,} rows."
     )
     return total_rows
 
@@ -141,13 +790,171 @@ def main():
         default=TABLE_NAME,
         help="Name of the table to store metadata in.",
     )
+    parser.add_argument(
+        "--engine",
+        choices=["pandas", "native"],
+        default="pandas",
+        help="Loader to use. 'native' inserts with sqlite3 executemany in a "
+        "single transaction with an explicit schema and is much faster on "
+        "large dumps.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        help="Rows per executemany batch (native engine only).",
+    )
+    parser.add_argument(
+        "--journal-mode",
+        default=DEFAULT_PRAGMAS["journal_mode"],
+        choices=["OFF", "MEMORY", "DELETE", "TRUNCATE", "PERSIST", "WAL"],
+        help="PRAGMA journal_mode during the load (native engine only).",
+    )
+    parser.add_argument(
+        "--synchronous",
+        default=DEFAULT_PRAGMAS["synchronous"],
+        choices=["OFF", "NORMAL", "FULL", "EXTRA"],
+        help="PRAGMA synchronous during the load (native engine only).",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_PRAGMAS["cache_size"],
+        help="PRAGMA cache_size; negative values are KiB (native engine only).",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        default=DEFAULT_PRAGMAS["page_size"],
+        help="PRAGMA page_size; only takes effect on a new database file "
+        "(native engine only).",
+    )
+    parser.add_argument(
+        "--schema",
+        choices=["wide", "compact"],
+        default="wide",
+        help="'compact' moves companies, filing types, languages and countries "
+        "into lookup tables, keeps dates as text and exposes the original "
+        "columns through a view (native engine only).",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["replace", "upsert"],
+        default="replace",
+        help="'replace' recreates the table. 'upsert' keeps it and only writes "
+        f"new or changed rows, keyed on '{KEY_COLUMN}' (native engine only).",
+    )
+    parser.add_argument(
+        "--commit-every",
+        type=int,
+        default=0,
+        help="Commit and record a resume checkpoint after this many rows. "
+        "0 loads everything in one transaction (native engine only).",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted load from its last checkpoint "
+        "(native engine only).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of CSV parser processes feeding the single SQLite writer. "
+        "Values above 1 cannot be combined with --commit-every or --resume "
+        "(native engine only).",
+    )
+    parser.add_argument(
+        "--no-progress",
+        action="store_true",
+        help="Do not display a progress bar.",
+    )
+    parser.add_argument(
+        "--build-indexes",
+        action="store_true",
+        help="After loading, build indexes on the common access paths "
+        "(ISIN, filing type, release date, country) and run ANALYZE.",
+    )
+    parser.add_argument(
+        "--indexes",
+        type=parse_index_names,
+        default=None,
+        help="Comma-separated subset of indexes to build with --build-indexes "
+        f"({', '.join(INDEX_DEFINITIONS)}). Defaults to all.",
+    )
+    parser.add_argument(
+        "--benchmark-queries",
+        action="store_true",
+        help="With --build-indexes, time a set of standard queries before and "
+        "after indexing.",
+    )
     args = parser.parse_args()
 
     validate_input_file(args.input)
-    engine = create_sqlite_engine(args.db_name)
 
-    load_csv_to_sqlite(args.input, engine, args.table_name, CHUNK_SIZE)
+    if args.engine != "native" and (
+        args.mode != "replace"
+        or args.commit_every
+        or args.resume
+        or args.schema != "wide"
+    ):
+        parser.error(
+            "--mode upsert, --schema compact, --commit-every and --resume "
+            "need --engine native."
+        )
+    if args.journal_mode in ROLLBACK_FREE_JOURNAL_MODES and (
+        args.mode == "upsert" or args.commit_every or args.resume
+    ):
+        parser.error(
+            f"--journal-mode {args.journal_mode} cannot roll back a failed load; "
+            "use MEMORY, DELETE or WAL with --mode upsert, --commit-every or --resume."
+        )
+    if args.workers > 1 and (args.engine != "native" or args.commit_every or args.resume):
+        parser.error("--workers needs --engine native and no --commit-every/--resume.")
+    if detect_codec(args.input) and (args.workers > 1 or args.resume):
+        parser.error(
+            "--workers and --resume need random access; decompress the input first."
+        )
+
+    if args.engine == "native":
+        pragmas = {
+            # page_size must be set before anything else touches the file.
+            "page_size": args.page_size,
+            "journal_mode": args.journal_mode,
+            "synchronous": args.synchronous,
+            "cache_size": args.cache_size,
+        }
+        load_csv_to_sqlite_native(
+            args.input,
+            args.db_name,
+            args.table_name,
+            args.batch_size,
+            pragmas,
+            mode=args.mode,
+            commit_every=args.commit_every,
+            resume=args.resume,
+            workers=args.workers,
+            show_progress=not args.no_progress,
+            schema=args.schema,
+        )
+    else:
+        engine = create_sqlite_engine(args.db_name)
+        load_csv_to_sqlite(
+            args.input,
+            engine,
+            args.table_name,
+            CHUNK_SIZE,
+            show_progress=not args.no_progress,
+        )
+        engine.dispose()
+
+    if args.build_indexes:
+        index_database(
+            args.db_name, args.table_name, args.indexes, args.benchmark_queries
+        )
 
+    logging.info(f"Database size: {args.db_name.stat().st_size / 1e6:,.1f} MB.")
     logging.info("Process complete.")
     logging.info(f"You can now query your data in '{args.db_name}'.")
     logging.info(f"Example query tool: `sqlite3 {args.db_name}`")
@@ -0,0 +1,556 @@
+import argparse
+import logging
+import os
+import re
+import sqlite3
+import sys
+import time
+from collections import Counter, defaultdict
+from multiprocessing import Pool
+from pathlib import Path
+
+from tqdm import tqdm
+
+from build_indexes import get_table_columns, quote_identifier
+
+# Configure logging for clear output
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+
+# --- Configuration ---
+# The name of the table created by load_to_sqlite.py.
+TABLE_NAME = "filings_metadata"
+# Postings (one per term and filing) collected in memory before they are
+# written as one segment. Bounds memory to a few hundred MB however large the
+# files are; a segment holds at least one file.
+POSTINGS_PER_SEGMENT = 2_000_000
+# Files sent to a worker process at a time.
+FILES_PER_TASK = 8
+# Longest phrase (in words) that is indexed. 2 also indexes word pairs such as
+# "supply chain", at the cost of a larger index.
+DEFAULT_MAX_NGRAM = 2
+# Words: runs of letters, digits and underscores, as matched by the regex \w+.
+WORD_PATTERN = re.compile(r"\w+")
+# Periods for time series, as SQL expressions over release_date ('YYYY-MM-DD').
+PERIODS = {
+    "quarter": "substr(m.release_date, 1, 4) || '-Q' || "
+    "((CAST(substr(m.release_date, 6, 2) AS INTEGER) + 2) / 3)",
+    "year": "substr(m.release_date, 1, 4)",
+    "month": "substr(m.release_date, 1, 7)",
+}
+
+
+def index_table_names(table_name: str):
+    """Returns the names of the postings, file-state and settings tables."""
+    return f"{table_name}_terms", f"{table_name}_terms_files", f"{table_name}_terms_meta"
+
+
+# --- Posting list encoding ---
+# A posting list is the sorted filing ids containing a term, each with the
+# number of occurrences. Ids are stored as differences to the previous id and
+# every number as a variable-length integer (7 bits per byte), so most
+# entries take two or three bytes.
+
+def encode_postings(postings: list) -> bytes:
+    """Encodes a list of (filing_id, frequency) sorted by filing_id."""
+    out = bytearray()
+    previous = 0
+    for filing_id, frequency in postings:
+        for value in (filing_id - previous, frequency):
+            while value >= 0x80:
+                out.append((value & 0x7F) | 0x80)
+                value >>= 7
+            out.append(value)
+        previous = filing_id
+    return bytes(out)
+
+
+def decode_postings(data: bytes) -> list:
+    """Decodes the output of encode_postings back into (filing_id, frequency) pairs."""
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    postings = []
+    filing_id = 0
+    for i in range(0, len(values), 2):
+        filing_id += values[i]
+        postings.append((filing_id, values[i + 1]))
+    return postings
+
+
+def normalize_term(term: str) -> str:
+    """Lowercases a keyword or phrase and joins its words with single spaces."""
+    return " ".join(WORD_PATTERN.findall(term.lower()))
+
+
+def count_terms(text: str, max_ngram: int) -> Counter:
+    """Counts the words and phrases of up to `max_ngram` words in a text."""
+    words = WORD_PATTERN.findall(text.lower())
+    counts = Counter(words)
+    for n in range(2, max_ngram + 1):
+        counts.update(" ".join(words[i:i + n]) for i in range(len(words) - n + 1))
+    return counts
+
+
+def count_file(task: tuple) -> tuple:
+    """Worker: returns (filing_id, term counts or None if the file is unreadable)."""
+    filing_id, path, max_ngram = task
+    try:
+        text = Path(path).read_text(encoding="utf-8", errors="replace")
+    except OSError:
+        return filing_id, None
+    return filing_id, count_terms(text, max_ngram)
+
+
+def create_index_tables(conn: sqlite3.Connection, table_name: str, max_ngram: int) -> int:
+    """
+    Creates the index tables and returns the phrase length of the index. An
+    existing index keeps the phrase length it was built with.
+
+    * `<table>_terms`: one compressed posting list per term and segment.
+    * `<table>_terms_files`: size and modification time of each indexed
+      file, and the segment holding its current postings.
+    * `<table>_terms_meta`: index settings, and the number of the next
+      segment (segments can outlive every filing that pointed at them, so
+      it cannot be derived from the files table).
+    """
+    terms_table, files_table, meta_table = index_table_names(table_name)
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {quote_identifier(terms_table)} ("
+        "term TEXT NOT NULL, segment INTEGER NOT NULL, postings BLOB NOT NULL, "
+        "PRIMARY KEY (term, segment)) WITHOUT ROWID"
+    )
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {quote_identifier(files_table)} ("
+        "id INTEGER PRIMARY KEY, size INTEGER, mtime REAL, segment INTEGER)"
+    )
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {quote_identifier(meta_table)} "
+        "(key TEXT PRIMARY KEY, value)"
+    )
+    conn.execute(
+        f"INSERT OR IGNORE INTO {quote_identifier(meta_table)} VALUES ('max_ngram', ?)",
+        (max_ngram,),
+    )
+    conn.commit()
+    (stored,) = conn.execute(
+        f"SELECT value FROM {quote_identifier(meta_table)} WHERE key = 'max_ngram'"
+    ).fetchone()
+    return int(stored)
+
+
+def allocate_segment(conn: sqlite3.Connection, table_name: str) -> int:
+    """Takes the next unused segment number. Call it inside a transaction."""
+    terms_table, _, meta_table = index_table_names(table_name)
+    meta = quote_identifier(meta_table)
+    row = conn.execute(f"SELECT value FROM {meta} WHERE key = 'next_segment'").fetchone()
+    if row is None:
+        # Indexes built before the counter existed continue after their last segment.
+        row = conn.execute(
+            f"SELECT COALESCE(MAX(segment), 0) + 1 FROM {quote_identifier(terms_table)}"
+        ).fetchone()
+    segment = int(row[0])
+    conn.execute(
+        f"INSERT OR REPLACE INTO {meta} VALUES ('next_segment', ?)", (segment + 1,)
+    )
+    return segment
+
+
+def write_segment(conn, table_name: str, postings: dict, files: list):
+    """
+    Writes the postings of one batch of files as a new segment, and points
+    the files at it, in one transaction.
+    """
+    terms_table, files_table, _ = index_table_names(table_name)
+    with conn:
+        segment = allocate_segment(conn, table_name)
+        conn.executemany(
+            f"INSERT INTO {quote_identifier(terms_table)} (term, segment, postings) "
+            "VALUES (?, ?, ?)",
+            (
+                (term, segment, encode_postings(sorted(entries)))
+                for term, entries in postings.items()
+            ),
+        )
+        conn.executemany(
+            f"INSERT OR REPLACE INTO {quote_identifier(files_table)} "
+            "(id, size, mtime, segment) VALUES (?, ?, ?, ?)",
+            ((filing_id, size, mtime, segment) for filing_id, size, mtime in files),
+        )
+
+
+def index_terms(
+    db_path: Path,
+    markdown_dir: Path,
+    table_name: str = TABLE_NAME,
+    max_ngram: int = DEFAULT_MAX_NGRAM,
+    workers: int = None,
+    show_progress: bool = True,
+) -> dict:
+    """
+    Adds the markdown files of the filings in `table_name` to the term index.
+
+    Each run writes the new and changed files as new segments; unchanged
+    files (same size and modification time) are skipped. Postings of a
+    changed or removed filing stay in its old segment until optimize_index
+    rewrites the index, but are ignored by queries.
+
+    Returns:
+        A dict with the counts 'indexed', 'unchanged', 'missing' and 'removed'.
+    """
+    if not Path(db_path).exists():
+        logging.error(f"Database not found: {db_path}")
+        sys.exit(1)
+    if not Path(markdown_dir).is_dir():
+        logging.error(f"Markdown directory not found: {markdown_dir}")
+        sys.exit(1)
+
+    _, files_table, _ = index_table_names(table_name)
+    stats = {"indexed": 0, "unchanged": 0, "missing": 0, "removed": 0}
+    start_time = time.time()
+
+    conn = sqlite3.connect(db_path)
+    try:
+        if "markdown_filename" not in get_table_columns(conn, table_name):
+            logging.error(
+                f"Table '{table_name}' in '{db_path}' has no markdown_filename column."
+            )
+            sys.exit(1)
+        max_ngram = create_index_tables(conn, table_name, max_ngram)
+        indexed_files = {
+            row[0]: (row[1], row[2])
+            for row in conn.execute(f"SELECT id, size, mtime FROM {quote_identifier(files_table)}")
+        }
+        filings = conn.execute(
+            f"SELECT id, markdown_filename FROM {quote_identifier(table_name)} "
+            "WHERE markdown_filename IS NOT NULL"
+        ).fetchall()
+
+        tasks, file_stats = [], {}
+        for filing_id, filename in filings:
+            path = Path(markdown_dir) / filename
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stats["missing"] += 1
+                continue
+            if indexed_files.get(filing_id) == (stat.st_size, stat.st_mtime):
+                stats["unchanged"] += 1
+                continue
+            file_stats[filing_id] = (stat.st_size, stat.st_mtime)
+            tasks.append((filing_id, str(path), max_ngram))
+        logging.info(
+            f"Indexing {len(tasks):,} of {len(filings):,} filings "
+            f"(phrases of up to {max_ngram} words)..."
+        )
+
+        postings = defaultdict(list)
+        segment_files = []
+        segment_postings = 0
+        with Pool(workers or os.cpu_count()) as pool:
+            results = pool.imap_unordered(count_file, tasks, chunksize=FILES_PER_TASK)
+            for filing_id, counts in tqdm(
+                results, total=len(tasks), desc="Indexing", unit="files",
+                disable=not show_progress,
+            ):
+                if counts is None:
+                    stats["missing"] += 1
+                    continue
+                for term, frequency in counts.items():
+                    postings[term].append((filing_id, frequency))
+                segment_files.append((filing_id, *file_stats[filing_id]))
+                segment_postings += len(counts)
+                stats["indexed"] += 1
+                if segment_postings >= POSTINGS_PER_SEGMENT:
+                    write_segment(conn, table_name, postings, segment_files)
+                    postings = defaultdict(list)
+                    segment_files = []
+                    segment_postings = 0
+        if segment_files:
+            write_segment(conn, table_name, postings, segment_files)
+
+        # Forget filings that were removed from the metadata table.
+        stale = indexed_files.keys() - {filing_id for filing_id, _ in filings}
+        with conn:
+            conn.executemany(
+                f"DELETE FROM {quote_identifier(files_table)} WHERE id = ?",
+                [(filing_id,) for filing_id in stale],
+            )
+        stats["removed"] = len(stale)
+    except sqlite3.Error as e:
+        logging.error(f"SQLite error while indexing '{db_path}': {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    logging.info(
+        f"Indexed {stats['indexed']:,} files, skipped {stats['unchanged']:,} "
+        f"unchanged, {stats['missing']:,} missing, removed {stats['removed']:,} "
+        f"in {time.time() - start_time:.2f} seconds."
+    )
+    return stats
+
+
+def read_postings(conn: sqlite3.Connection, table_name: str, term: str, live: dict) -> list:
+    """
+    Returns the (filing_id, frequency) pairs of a term from all segments,
+    keeping only the postings from each filing's current segment.
+    """
+    terms_table, _, _ = index_table_names(table_name)
+    postings = []
+    for segment, data in conn.execute(
+        f"SELECT segment, postings FROM {quote_identifier(terms_table)} WHERE term = ?",
+        (term,),
+    ):
+        postings.extend(
+            entry for entry in decode_postings(data) if live.get(entry[0]) == segment
+        )
+    return postings
+
+
+def optimize_index(db_path: Path, table_name: str = TABLE_NAME):
+    """
+    Merges all segments into one, dropping the postings of changed and
+    removed filings. Queries then read a single posting list per term.
+
+    The merged lists are written to a new table in one INSERT ... SELECT
+    ... GROUP BY term pass, which replaces the old table.
+    """
+    terms_table, files_table, _ = index_table_names(table_name)
+    merged_table = f"{terms_table}_merged"
+    start = time.time()
+    conn = sqlite3.connect(db_path)
+    try:
+        live = dict(conn.execute(f"SELECT id, segment FROM {quote_identifier(files_table)}"))
+
+        class MergePostings:
+            """Aggregate: the live postings of a term's segments as one list."""
+
+            def __init__(self):
+                self.postings = []
+
+            def step(self, segment, data):
+                self.postings.extend(
+                    entry for entry in decode_postings(data) if live.get(entry[0]) == segment
+                )
+
+            def finalize(self):
+                # Terms whose filings all changed or were removed are dropped.
+                return encode_postings(sorted(self.postings)) if self.postings else None
+
+        conn.create_aggregate("merge_postings", 2, MergePostings)
+        with conn:
+            segment = allocate_segment(conn, table_name)
+            conn.execute(f"DROP TABLE IF EXISTS {quote_identifier(merged_table)}")
+            conn.execute(
+                f"CREATE TABLE {quote_identifier(merged_table)} ("
+                "term TEXT NOT NULL, segment INTEGER NOT NULL, postings BLOB NOT NULL, "
+                "PRIMARY KEY (term, segment)) WITHOUT ROWID"
+            )
+            conn.execute(
+                f"INSERT INTO {quote_identifier(merged_table)} (term, segment, postings) "
+                "SELECT term, ?, postings FROM ("
+                "SELECT term, merge_postings(segment, postings) AS postings "
+                f"FROM {quote_identifier(terms_table)} GROUP BY term"
+                ") WHERE postings IS NOT NULL",
+                (segment,),
+            )
+            conn.execute(f"DROP TABLE {quote_identifier(terms_table)}")
+            conn.execute(
+                f"ALTER TABLE {quote_identifier(merged_table)} "
+                f"RENAME TO {quote_identifier(terms_table)}"
+            )
+            conn.execute(f"UPDATE {quote_identifier(files_table)} SET segment = ?", (segment,))
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
+    logging.info(
+        f"Merged the term index into one segment in {time.time() - start:.2f} seconds."
+    )
+
+
+def term_counts(
+    db_path: Path,
+    terms: list,
+    table_name: str = TABLE_NAME,
+    by: str = None,
+    isins=None,
+    filing_types=None,
+) -> list:
+    """
+    Looks up keyword counts in the index, without reading any text.
+
+    Args:
+        terms: Words or phrases (of up to the indexed phrase length).
+        by: None for totals, or 'quarter', 'year' or 'month' for a time series.
+        isins, filing_types: Optional lists to restrict the filings.
+
+    Returns:
+        A list of dicts with 'term', 'period' (if `by` is set), 'filings'
+        (number of filings containing the term) and 'count'.
+    """
+    _, files_table, meta_table = index_table_names(table_name)
+    conn = sqlite3.connect(db_path)
+    try:
+        (max_ngram,) = conn.execute(
+            f"SELECT value FROM {quote_identifier(meta_table)} WHERE key = 'max_ngram'"
+        ).fetchone()
+        live = dict(conn.execute(f"SELECT id, segment FROM {quote_identifier(files_table)}"))
+
+        where, params = [], []
+        for column, values in (("isin", isins), ("filing_type_code", filing_types)):
+            if values:
+                where.append(f"m.{column} IN ({', '.join('?' for _ in values)})")
+                params.extend(values)
+        period = PERIODS[by] + " AS period, " if by else ""
+        query = (
+            f"SELECT {period}COUNT(*) AS filings, SUM(h.frequency) AS count "
+            f"FROM temp.hits AS h JOIN {quote_identifier(table_name)} AS m ON m.id = h.id"
+            + (" WHERE " + " AND ".join(where) if where else "")
+            + (" GROUP BY period ORDER BY period" if by else "")
+        )
+
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS hits (id INTEGER PRIMARY KEY, frequency INTEGER)")
+        results = []
+        for term in terms:
+            normalized = normalize_term(term)
+            if len(normalized.split()) > int(max_ngram):
+                raise ValueError(
+                    f"'{term}' has more than {max_ngram} words, the longest phrase "
+                    "in the index. Rebuild it with a larger --max-ngram."
+                )
+            conn.execute("DELETE FROM temp.hits")
+            conn.executemany(
+                "INSERT INTO temp.hits (id, frequency) VALUES (?, ?)",
+                read_postings(conn, table_name, normalized, live),
+            )
+            for row in conn.execute(query, params):
+                if by:
+                    results.append({"term": term, "period": row[0], "filings": row[1], "count": row[2]})
+                else:
+                    results.append({"term": term, "filings": row[0], "count": row[1] or 0})
+    finally:
+        conn.close()
+    return results
+
+
+def index_size(db_path: Path, table_name: str = TABLE_NAME) -> dict:
+    """Returns the number of terms, segments and the bytes of posting data."""
+    terms_table, _, _ = index_table_names(table_name)
+    conn = sqlite3.connect(db_path)
+    try:
+        terms, segments, size = conn.execute(
+            f"SELECT COUNT(DISTINCT term), COUNT(DISTINCT segment), SUM(length(postings)) "
+            f"FROM {quote_identifier(terms_table)}"
+        ).fetchone()
+    finally:
+        conn.close()
+    return {"terms": terms, "segments": segments, "postings_bytes": size or 0}
+
+
+def main():
+    """Main function to parse arguments and build or query the term index."""
+    parser = argparse.ArgumentParser(
+        description="Build and query an inverted index of the words and phrases "
+        "in the markdown files of a FinancialReports data dump.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--db-name",
+        type=Path,
+        default="financialreports.db",
+        help="Path to the SQLite database created by load_to_sqlite.py.",
+    )
+    parser.add_argument(
+        "--table-name",
+        type=str,
+        default=TABLE_NAME,
+        help="Name of the metadata table.",
+    )
+    parser.add_argument(
+        "--markdown-dir",
+        type=Path,
+        help="Directory containing the dump's markdown files. Adds new and "
+        "changed files to the index.",
+    )
+    parser.add_argument(
+        "--max-ngram",
+        type=int,
+        default=DEFAULT_MAX_NGRAM,
+        help="Longest phrase (in words) to index. Only used when the index is created.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of worker processes for indexing (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--optimize",
+        action="store_true",
+        help="Merge the index segments after indexing and drop outdated postings.",
+    )
+    parser.add_argument(
+        "--terms",
+        nargs="+",
+        help="Words or phrases to count, e.g. --terms inflation \"supply chain\".",
+    )
+    parser.add_argument(
+        "--by",
+        choices=sorted(PERIODS),
+        help="Show the counts per period instead of totals.",
+    )
+    parser.add_argument("--isin", nargs="+", help="Only count filings of these ISINs.")
+    parser.add_argument(
+        "--filing-types", nargs="+", help="Only count filings of these types."
+    )
+    parser.add_argument(
+        "--no-progress",
+        action="store_true",
+        help="Do not display a progress bar while indexing.",
+    )
+    args = parser.parse_args()
+
+    if not (args.markdown_dir or args.terms or args.optimize):
+        parser.error("Nothing to do: pass --markdown-dir, --optimize and/or --terms.")
+
+    if args.markdown_dir:
+        index_terms(
+            args.db_name, args.markdown_dir, args.table_name, args.max_ngram,
+            args.workers, not args.no_progress,
+        )
+    if args.optimize:
+        optimize_index(args.db_name, args.table_name)
+    if args.markdown_dir or args.optimize:
+        size = index_size(args.db_name, args.table_name)
+        logging.info(
+            f"Index: {size['terms']:,} terms in {size['segments']:,} segment(s), "
+            f"{size['postings_bytes'] / 1024**2:.1f} MB of postings."
+        )
+    if args.terms:
+        start = time.perf_counter()
+        try:
+            results = term_counts(
+                args.db_name, args.terms, args.table_name, args.by, args.isin,
+                args.filing_types,
+            )
+        except (sqlite3.Error, ValueError) as e:
+            logging.error(f"Lookup failed: {e}")
+            sys.exit(1)
+        duration = time.perf_counter() - start
+        print(f"\n--- Term counts ({duration * 1000:.1f} ms) ---")
+        for row in results:
+            period = f"{row['period']}  " if args.by else ""
+            print(f"{row['term']:<30} {period}{row['count']:>10,} in {row['filings']:,} filings")
+
+
+if __name__ == "__main__":
+    main()
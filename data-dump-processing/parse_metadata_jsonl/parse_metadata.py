@@ -1,45 +1,569 @@
+import os
 import sys
+import csv
+import json
+import mmap
+import time
+import datetime
+import sqlite3
 import argparse
+import multiprocessing
+from collections import Counter
 import pandas as pd
 
-def parse_metadata(metadata_file: str, isin: str = None, filing_type: str = None):
+from compressed_input import detect_codec, open_input
+
+# orjson parses JSON several times faster than the standard library; it is
+# optional, and json.loads is used when it is not installed.
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+# Fields of the metadata records that the filters look at.
+ISIN_FIELD = 'company_isin'
+FILING_TYPE_FIELD = 'filing_type'
+
+# Sidecar offset index: '<metadata file>.idx', an SQLite file mapping the
+# values of these fields to the byte offsets of their lines.
+INDEX_SUFFIX = '.idx'
+INDEXED_FIELDS = (ISIN_FIELD, FILING_TYPE_FIELD)
+INDEX_BATCH_SIZE = 100000
+
+# Field that holds the release date; dates compare as 'YYYY-MM-DD' strings.
+DATE_FIELD = 'release_date'
+
+# Parallel scans split the file into newline-aligned ranges of about this size.
+RANGE_BYTES = 32 * 1024 * 1024
+# Computed field for --count-by: the year of the release date.
+YEAR_FIELD = 'year'
+
+class RecordFilter:
     """
-    Loads a .jsonl metadata file into pandas and filters it based on
-    ISIN or filing_type.
+    Predicate over one metadata record (a dict parsed from a JSONL line).
+
+    All given conditions must hold: the ISIN is one of `isins`, the filing
+    type is one of `filing_types` and the release date lies between
+    `date_from` and `date_to` (inclusive, 'YYYY-MM-DD'). ISINs and filing
+    types are compared case-insensitively through hash-set lookups, so the
+    cost per record does not depend on how many keys are given.
     """
-    
-    print(f"Loading metadata from '{metadata_file}'...")
-    
+
+    def __init__(self, isins=None, filing_types=None, date_from: str = None, date_to: str = None):
+        self.isins = {value.strip().upper() for value in isins} if isins else None
+        self.filing_types = {value.strip().upper() for value in filing_types} if filing_types else None
+        self.date_from = date_from
+        self.date_to = date_to
+
+    def __call__(self, record: dict) -> bool:
+        if self.isins is not None and str(record.get(ISIN_FIELD) or '').upper() not in self.isins:
+            return False
+        if self.filing_types is not None and str(record.get(FILING_TYPE_FIELD) or '').upper() not in self.filing_types:
+            return False
+        if self.date_from or self.date_to:
+            release_date = str(record.get(DATE_FIELD) or '')[:10]
+            if not release_date:
+                return False
+            if self.date_from and release_date < self.date_from:
+                return False
+            if self.date_to and release_date > self.date_to:
+                return False
+        return True
+
+    def needle(self):
+        """
+        Bytes that must appear in an upper-cased line for it to match, or None.
+        Lines without them are skipped without being parsed. Only used for a
+        single key that JSON cannot write with escape sequences.
+        """
+        keys = self.isins if self.isins is not None else self.filing_types
+        if keys is None or len(keys) != 1:
+            return None
+        value = next(iter(keys))
+        if value and value.isascii() and value.isprintable() and not set(value) & set('"\\/'):
+            return value.encode()
+        return None
+
+def iter_matches(stream, record_filter: RecordFilter):
+    """
+    Yields the records of a binary JSONL stream that pass `record_filter`.
+    Only one line is held in memory at a time.
+    """
+    needle = record_filter.needle()
+    for line_number, line in enumerate(stream, start=1):
+        if needle and needle not in line.upper():
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json_loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {line_number}: {e}") from None
+        if record_filter(record):
+            yield record
+
+def write_matches(records, output, output_format: str) -> int:
+    """
+    Writes records to a text file object as NDJSON or CSV as they arrive.
+    The CSV header is taken from the first record.
+
+    Returns:
+        The number of records written.
+    """
+    count = 0
+    writer = None
+    for record in records:
+        if output_format == 'csv':
+            if writer is None:
+                writer = csv.DictWriter(output, fieldnames=list(record), extrasaction='ignore')
+                writer.writeheader()
+            writer.writerow(record)
+        else:
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+def index_path(metadata_file: str) -> str:
+    """Path of the sidecar offset index of a metadata file."""
+    return metadata_file + INDEX_SUFFIX
+
+def file_signature(metadata_file: str):
+    """(size, mtime in ns) of a file; the index is only valid for these values."""
+    stat = os.stat(metadata_file)
+    return stat.st_size, stat.st_mtime_ns
+
+def build_offset_index(metadata_file: str) -> int:
+    """
+    Scans an uncompressed .jsonl file once and writes the sidecar index that
+    maps each company_isin and filing_type (upper-cased) to the byte offsets
+    of its lines. The index is written to a temporary file and renamed, so an
+    interrupted build never leaves a partial index behind.
+
+    Returns:
+        The number of records indexed.
+    """
+    codec = detect_codec(metadata_file)
+    if codec:
+        raise ValueError(f"cannot index {codec} compressed files; decompress the file first")
+
+    signature = file_signature(metadata_file)
+    target = index_path(metadata_file)
+    temp_path = target + '.tmp'
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    conn = sqlite3.connect(temp_path)
     try:
-        # Load the JSON Lines file into a DataFrame
-        # 'lines=True' tells pandas to read one JSON object per line
-        df = pd.read_json(metadata_file, lines=True)
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("CREATE TABLE index_info (size INTEGER, mtime_ns INTEGER, records INTEGER)")
+        # Clustered on (field, key, offset): a lookup reads one contiguous range.
+        conn.execute(
+            "CREATE TABLE offsets (field TEXT, key TEXT, offset INTEGER, "
+            "PRIMARY KEY (field, key, offset)) WITHOUT ROWID"
+        )
+
+        records = 0
+        rows = []
+        offset = 0
+        with open(metadata_file, 'rb') as f:
+            for line_number, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        record = json_loads(line)
+                    except ValueError as e:
+                        raise ValueError(f"line {line_number}: {e}") from None
+                    for field in INDEXED_FIELDS:
+                        value = record.get(field)
+                        if value is not None:
+                            rows.append((field, str(value).upper(), offset))
+                    records += 1
+                    if len(rows) >= INDEX_BATCH_SIZE:
+                        conn.executemany("INSERT INTO offsets VALUES (?, ?, ?)", rows)
+                        rows = []
+                offset += len(line)
+        conn.executemany("INSERT INTO offsets VALUES (?, ?, ?)", rows)
+
+        if file_signature(metadata_file) != signature:
+            raise ValueError("the file changed while it was being indexed")
+        conn.execute("INSERT INTO index_info VALUES (?, ?, ?)", (*signature, records))
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(temp_path, target)
+    return records
+
+def open_offset_index(metadata_file: str, log=sys.stdout):
+    """
+    Opens the sidecar index of a metadata file if it exists and still matches
+    the file's size and modification time. Returns None otherwise.
+    """
+    path = index_path(metadata_file)
+    if not os.path.exists(path) or not os.path.exists(metadata_file):
+        return None
+
+    conn = sqlite3.connect(path)
+    try:
+        info = conn.execute("SELECT size, mtime_ns FROM index_info").fetchone()
+    except sqlite3.Error:
+        info = None
+    if info is None or tuple(info) != file_signature(metadata_file):
+        conn.close()
+        print(f"Ignoring out-of-date index '{path}'. Rebuild it with --build-index.", file=log)
+        return None
+    return conn
+
+def iter_indexed_matches(metadata_file: str, conn, record_filter: RecordFilter):
+    """
+    Yields matching records by seeking to the offsets stored in the sidecar
+    index, in file order. Each line is still checked against the whole filter.
+    """
+    if record_filter.isins is not None:
+        field, keys = ISIN_FIELD, record_filter.isins
+    else:
+        field, keys = FILING_TYPE_FIELD, record_filter.filing_types
+
+    # Join against a temporary key table, so thousands of keys take one query.
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS lookup_keys (key TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM lookup_keys")
+    conn.executemany("INSERT INTO lookup_keys VALUES (?)", [(key,) for key in keys])
+    offsets = conn.execute(
+        "SELECT o.offset FROM lookup_keys AS k "
+        "JOIN offsets AS o ON o.field = ? AND o.key = k.key ORDER BY o.offset",
+        (field,),
+    )
+    with open(metadata_file, 'rb') as f:
+        for (offset,) in offsets:
+            f.seek(offset)
+            record = json_loads(f.readline())
+            if record_filter(record):
+                yield record
+
+def scan_matches(metadata_file: str, record_filter: RecordFilter, log=sys.stdout):
+    """Yields matching records by scanning the whole (possibly compressed) file."""
+    stream, _, codec = open_input(metadata_file)
+    if codec:
+        print(f"Decompressing {codec} input...", file=log)
+    with stream:
+        yield from iter_matches(stream, record_filter)
+
+def split_ranges(mm, range_bytes: int = RANGE_BYTES) -> list:
+    """Splits a memory-mapped file into (start, end) ranges that end after a newline."""
+    size = len(mm)
+    ranges = []
+    start = 0
+    while start < size:
+        newline = mm.find(b'\n', min(start + range_bytes, size) - 1)
+        end = size if newline == -1 else newline + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+def iter_range_lines(mm, start: int, end: int):
+    """Yields the lines of mm[start:end] without copying the whole range."""
+    position = start
+    while position < end:
+        newline = mm.find(b'\n', position, end)
+        stop = end if newline == -1 else newline + 1
+        yield mm[position:stop]
+        position = stop
+
+def count_key(record: dict, fields: list) -> tuple:
+    """The values of `fields` in a record; 'year' is taken from the release date."""
+    return tuple(
+        str(record.get(DATE_FIELD) or '')[:4] if field == YEAR_FIELD and field not in record
+        else record.get(field)
+        for field in fields
+    )
+
+def count_records(records, fields: list) -> Counter:
+    """Counts records by the values of `fields`."""
+    return Counter(count_key(record, fields) for record in records)
+
+def scan_range(task):
+    """
+    Worker: filters one byte range of a metadata file. Returns the matching
+    records, or their counts by `count_by` if it is given.
+    """
+    metadata_file, start, end, record_filter, count_by = task
+    with open(metadata_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        try:
+            matches = iter_matches(iter_range_lines(mm, start, end), record_filter)
+            return count_records(matches, count_by) if count_by else list(matches)
+        except ValueError as e:
+            raise ValueError(f"byte range starting at {start}, {e}") from None
+
+def range_tasks(metadata_file: str, record_filter: RecordFilter, count_by: list = None) -> list:
+    """
+    Memory-maps an uncompressed metadata file and splits it into
+    newline-aligned scan_range tasks. Returns [] for an empty file.
+    """
+    with open(metadata_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            ranges = split_ranges(mm)
+    return [(metadata_file, start, end, record_filter, count_by) for start, end in ranges]
+
+def parallel_scan(metadata_file: str, record_filter: RecordFilter, workers: int):
+    """
+    Filters an uncompressed metadata file in a pool of `workers` processes,
+    each running the same RecordFilter as the single-process scan on one
+    range of the file. Yields the matching records in file order.
+    """
+    tasks = range_tasks(metadata_file, record_filter)
+    if not tasks:
+        return
+    with multiprocessing.Pool(workers) as pool:
+        # imap returns results in task order, so the merged output keeps
+        # the order of the file.
+        for records in pool.imap(scan_range, tasks):
+            yield from records
+
+def parallel_counts(metadata_file: str, record_filter: RecordFilter, workers: int, count_by: list) -> Counter:
+    """
+    Counts the matching records by `count_by` with a parallel scan. Each
+    worker counts its own range, so only the counts are sent back.
+    """
+    totals = Counter()
+    tasks = range_tasks(metadata_file, record_filter, count_by)
+    if tasks:
+        with multiprocessing.Pool(workers) as pool:
+            for counts in pool.imap_unordered(scan_range, tasks):
+                totals.update(counts)
+    return totals
+
+def read_keys(path: str) -> list:
+    """Reads one ISIN or filing type per line; blank lines and '#' comments are skipped."""
+    with open(path, encoding='utf-8') as f:
+        keys = [line.split('#', 1)[0].strip() for line in f]
+    return [key for key in keys if key]
+
+def group_records(records, field: str, keys=None) -> dict:
+    """
+    Groups records by the upper-cased value of `field`. Groups follow the
+    order of `keys` (keys without matches get an empty group), then any other
+    values in order of first appearance.
+    """
+    groups = {key.upper(): [] for key in keys or []}
+    for record in records:
+        groups.setdefault(str(record.get(field) or '').upper(), []).append(record)
+    return groups
+
+def date_argument(value: str) -> str:
+    """argparse type for a YYYY-MM-DD date."""
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD")
+
+def describe_filter(record_filter: RecordFilter) -> str:
+    """Short description of a filter for the result header."""
+    parts = []
+    for label, keys in (("ISIN", record_filter.isins), ("filing type", record_filter.filing_types)):
+        if keys is not None:
+            parts.append(f"{label} {next(iter(keys))}" if len(keys) == 1 else f"{len(keys):,} {label}s")
+    if record_filter.date_from or record_filter.date_to:
+        parts.append(f"released {record_filter.date_from or '...'} to {record_filter.date_to or '...'}")
+    return ", ".join(parts)
+
+def parse_metadata(metadata_file: str, isin: str = None, filing_type: str = None,
+                   output: str = None, output_format: str = 'ndjson',
+                   record_filter: RecordFilter = None, group_by: str = None,
+                   workers: int = 1, count_by: list = None):
+    """
+    Streams a .jsonl metadata file and filters it by ISIN or filing_type.
+    gzip, bzip2, xz and zstd compressed files are decompressed on the fly.
+
+    Lines are parsed one at a time and only the matches are kept, so memory
+    use does not grow with the size of the file. If an up-to-date sidecar
+    index exists (see build_offset_index), only the matching lines are read.
+
+    Without `output` the matches are printed as a table; with it they are
+    written as NDJSON or CSV while the scan runs ('-' writes to stdout).
+
+    For batch queries, pass a RecordFilter with sets of ISINs or filing
+    types and a date range instead of `isin`/`filing_type`. All keys are
+    answered by the same single pass. With `group_by` (a field name) the
+    matches are collected and written grouped by that field's value.
+
+    With `workers` > 1, an uncompressed file is scanned in parallel (see
+    parallel_scan and parallel_counts). With `count_by` (field names, or 'year'), the matches
+    are counted by those fields instead of being listed.
+    """
+    # Keep stdout clean for the data when the matches are written there.
+    log = sys.stderr if output == '-' else sys.stdout
+    print(f"Loading metadata from '{metadata_file}'...", file=log)
+
+    if record_filter is None:
+        record_filter = RecordFilter(
+            [isin] if isin else None, [filing_type] if filing_type else None
+        )
+    keyed = record_filter.isins is not None or record_filter.filing_types is not None
+    index = None
+    counts = None
+    try:
+        index = open_offset_index(metadata_file, log) if keyed else None
+        parallel = workers > 1 and not index
+        if parallel and detect_codec(metadata_file):
+            print("Compressed input cannot be memory-mapped; scanning with one process.", file=log)
+            parallel = False
+
+        if index:
+            print(f"Using offset index '{index_path(metadata_file)}'.", file=log)
+            matches = iter_indexed_matches(metadata_file, index, record_filter)
+        elif parallel:
+            print(f"Scanning with {workers} processes...", file=log)
+            if count_by:
+                counts = parallel_counts(metadata_file, record_filter, workers, count_by)
+            else:
+                matches = parallel_scan(metadata_file, record_filter, workers)
+        else:
+            matches = scan_matches(metadata_file, record_filter, log)
+
+        if count_by:
+            if counts is None:
+                counts = count_records(matches, count_by)
+            # Report counts like records: one row per key, most frequent first.
+            matches = [
+                {**dict(zip(count_by, key)), 'count': n}
+                for key, n in sorted(counts.items(), key=lambda item: (-item[1], str(item[0])))
+            ]
+            group_by = None
+
+        groups = None
+        if group_by:
+            keys = record_filter.isins if group_by == ISIN_FIELD else record_filter.filing_types
+            groups = group_records(matches, group_by, sorted(keys) if keys else None)
+            matches = (record for records in groups.values() for record in records)
+
+        if output:
+            out = sys.stdout if output == '-' else open(output, 'w', encoding='utf-8', newline='')
+            try:
+                count = write_matches(matches, out, output_format)
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+        elif groups is None:
+            filtered_df = pd.DataFrame(list(matches))
     except FileNotFoundError:
         print(f"Error: Metadata file not found: '{metadata_file}'", file=sys.stderr)
         print("Please ensure 'sample_metadata.jsonl' is in the same directory.", file=sys.stderr)
         sys.exit(1)
-    except ValueError:
-        print(f"Error: Failed to parse '{metadata_file}'. Is it a valid .jsonl file?", file=sys.stderr)
+    except ValueError as e:
+        print(f"Error: Failed to parse '{metadata_file}' ({e}). Is it a valid .jsonl file?", file=sys.stderr)
         sys.exit(1)
     except Exception as e:
         print(f"An unexpected error occurred: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        if index:
+            index.close()
 
-    if df.empty:
-        print("Metadata file is empty. No documents to process.")
-        return
+    if count_by and output:
+        print(f"Wrote {count} count rows to '{output}' ({output_format}).", file=log)
+    elif count_by:
+        print(f"Matching documents for {describe_filter(record_filter) or 'all records'}, "
+              f"counted by {', '.join(count_by)}: {sum(counts.values())}")
+        print("--------------------------------------------------")
+        print(filtered_df.to_string(index=False) if not filtered_df.empty else "No matching documents found for your criteria.")
+    elif output:
+        print(f"Wrote {count} matching documents to '{output}' ({output_format}).", file=log)
+        if groups is not None:
+            empty = sum(1 for records in groups.values() if not records)
+            print(f"{len(groups) - empty} {group_by} value(s) with matches, {empty} without.", file=log)
+    elif groups is not None:
+        print_groups(groups, group_by, describe_filter(record_filter))
+    elif isin or filing_type:
+        print_matches(filtered_df, isin, filing_type)
+    else:
+        print_matches(filtered_df, description=describe_filter(record_filter))
 
-    filtered_df = pd.DataFrame()
+def parse_dataset(dataset_dir: str, isin: str = None, filing_type: str = None, columns: list = None,
+                  record_filter: RecordFilter = None, group_by: str = None):
+    """
+    Filters a Parquet dataset written by export_to_parquet.py.
+
+    The filter is pushed down to Arrow, so only the matching filing_type
+    partitions are opened for a filing-type query, and row groups whose
+    statistics cannot contain the ISINs or dates are skipped. Only the
+    requested columns are read. `record_filter` works as in parse_metadata.
+    """
+    try:
+        import pyarrow.dataset as ds
+    except ImportError:
+        print("Error: Reading a Parquet dataset requires 'pyarrow' (pip install pyarrow).", file=sys.stderr)
+        sys.exit(1)
 
+    print(f"Scanning Parquet dataset '{dataset_dir}'...")
+
+    try:
+        dataset = ds.dataset(dataset_dir, format="parquet", partitioning="hive")
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: Could not open dataset '{dataset_dir}': {e}", file=sys.stderr)
+        sys.exit(1)
+
+    # Datasets exported from the metadata CSV call the ISIN column 'isin'.
+    isin_column = 'company_isin' if 'company_isin' in dataset.schema.names else 'isin'
+
+    if record_filter is None:
+        record_filter = RecordFilter(
+            [isin] if isin else None, [filing_type] if filing_type else None
+        )
+
+    # ISINs and filing types are upper-case in the dumps, so exact set
+    # membership keeps the filter simple enough to push down.
+    conditions = []
+    if record_filter.isins is not None:
+        conditions.append(ds.field(isin_column).isin(sorted(record_filter.isins)))
+    if record_filter.filing_types is not None:
+        conditions.append(ds.field('filing_type').isin(sorted(record_filter.filing_types)))
+    if record_filter.date_from:
+        conditions.append(ds.field('release_date') >= datetime.date.fromisoformat(record_filter.date_from))
+    if record_filter.date_to:
+        conditions.append(ds.field('release_date') <= datetime.date.fromisoformat(record_filter.date_to))
+    expression = conditions[0]
+    for condition in conditions[1:]:
+        expression = expression & condition
+
+    group_column = isin_column if group_by == ISIN_FIELD else group_by
+    if columns and group_column and group_column not in columns:
+        columns = columns + [group_column]
+
+    try:
+        table = dataset.to_table(columns=columns, filter=expression)
+    except Exception as e:
+        print(f"Error: Failed to scan dataset '{dataset_dir}': {e}", file=sys.stderr)
+        sys.exit(1)
+
+    if group_by:
+        keys = record_filter.isins if group_by == ISIN_FIELD else record_filter.filing_types
+        groups = group_records(table.to_pylist(), group_column, sorted(keys) if keys else None)
+        print_groups(groups, group_column, describe_filter(record_filter))
+    elif isin or filing_type:
+        print_matches(table.to_pandas(), isin, filing_type)
+    else:
+        print_matches(table.to_pandas(), description=describe_filter(record_filter))
+
+def print_groups(groups: dict, group_by: str, description: str):
+    """Prints one table per group of matches."""
+    total = sum(len(records) for records in groups.values())
+    print(f"Found {total} documents for {description}, grouped by {group_by}:")
+    for key, records in groups.items():
+        print(f"\n== {key or '(none)'}: {len(records)} documents ==")
+        if records:
+            print(pd.DataFrame(records).to_string(index=False))
+
+def print_matches(filtered_df, isin: str = None, filing_type: str = None, description: str = None):
+    """Prints the filtered documents as an aligned table."""
     if isin:
-        # Filter by company_isin
-        filtered_df = df[df['company_isin'].str.upper() == isin.upper()]
         print(f"Found {len(filtered_df)} documents for ISIN {isin}:")
-        
     elif filing_type:
-        # Filter by filing_type
-        filtered_df = df[df['filing_type'].str.upper() == filing_type.upper()]
         print(f"Found {len(filtered_df)} documents for filing type '{filing_type}':")
+    elif description:
+        print(f"Found {len(filtered_df)} documents for {description}:")
         
     print("--------------------------------------------------")
     
@@ -59,22 +583,138 @@ if __name__ == "__main__":
     parser.add_argument(
         "-f", "--metadata-file",
         default="sample_metadata.jsonl",
-        help="Path to the metadata .jsonl file (default: sample_metadata.jsonl)"
+        help="Path to the metadata .jsonl file, optionally compressed with "
+             "gzip, bzip2, xz or zstd (default: sample_metadata.jsonl)"
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="Write the matches to this file instead of printing a table "
+             "('-' for stdout). Matches are written while the file is scanned."
+    )
+    parser.add_argument(
+        "--output-format",
+        choices=["ndjson", "csv"],
+        help="Format of --output (default: csv for a .csv file, otherwise ndjson)."
+    )
+    parser.add_argument(
+        "--dataset",
+        help="Query a partitioned Parquet dataset written by "
+             "export_to_parquet.py instead of the .jsonl file."
+    )
+    parser.add_argument(
+        "--columns",
+        nargs="+",
+        help="Only read these columns (with --dataset)."
     )
     
-    # Add mutually exclusive arguments for the filter criteria
-    group = parser.add_mutually_exclusive_group(required=True)
-    group.add_argument(
+    parser.add_argument(
+        "--build-index",
+        action="store_true",
+        help="Build the sidecar offset index '<metadata-file>.idx' for fast "
+             "ISIN and filing-type lookups, then exit. Later queries use it "
+             "automatically while the file is unchanged."
+    )
+
+    # Filter criteria. All given criteria must match.
+    parser.add_argument(
         "--isin",
         type=str,
         help="Filter documents by company ISIN (e.g., DE000A1EWWW0)."
     )
-    group.add_argument(
+    parser.add_argument(
         "--filing-type",
         type=str,
         help="Filter documents by filing type (e.g., 10-K)."
     )
+    parser.add_argument(
+        "--isin-file",
+        help="File with one ISIN per line. All ISINs are matched in a single pass."
+    )
+    parser.add_argument(
+        "--filing-type-file",
+        help="File with one filing type per line."
+    )
+    parser.add_argument(
+        "--date-from",
+        type=date_argument,
+        help="Only documents released on or after this date (YYYY-MM-DD)."
+    )
+    parser.add_argument(
+        "--date-to",
+        type=date_argument,
+        help="Only documents released on or before this date (YYYY-MM-DD)."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Scan an uncompressed .jsonl file with this many processes "
+             "(default: 1). Results keep the order of the file."
+    )
+    parser.add_argument(
+        "--count-by",
+        nargs="+",
+        help="Count the matching documents by these fields (e.g. filing_type "
+             "year) instead of listing them. 'year' is the release year."
+    )
+    parser.add_argument(
+        "--group-by",
+        choices=["isin", "filing_type", "none"],
+        help="Group the matches by ISIN or filing type (default: isin with "
+             "--isin-file, filing_type with --filing-type-file, else none)."
+    )
     
     args = parser.parse_args()
     
-    parse_metadata(args.metadata_file, args.isin, args.filing_type)
\ No newline at end of file
+    if args.build_index:
+        print(f"Building offset index for '{args.metadata_file}'...")
+        start = time.time()
+        try:
+            records = build_offset_index(args.metadata_file)
+        except FileNotFoundError:
+            print(f"Error: Metadata file not found: '{args.metadata_file}'", file=sys.stderr)
+            sys.exit(1)
+        except (ValueError, sqlite3.Error) as e:
+            print(f"Error: Could not index '{args.metadata_file}': {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Indexed {records} records in {time.time() - start:.2f} seconds: "
+              f"'{index_path(args.metadata_file)}'")
+        sys.exit(0)
+
+    try:
+        isins = ([args.isin] if args.isin else []) + (read_keys(args.isin_file) if args.isin_file else [])
+        filing_types = ([args.filing_type] if args.filing_type else []) + \
+            (read_keys(args.filing_type_file) if args.filing_type_file else [])
+    except OSError as e:
+        print(f"Error: Could not read key file: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not (isins or filing_types or args.date_from or args.date_to or args.count_by):
+        parser.error("give at least one of --isin, --filing-type, --isin-file, "
+                     "--filing-type-file, --date-from or --date-to")
+    if (args.isin_file and not isins) or (args.filing_type_file and not filing_types):
+        parser.error("the key file is empty")
+    if args.dataset and (args.count_by or args.workers != 1):
+        parser.error("--count-by and --workers cannot be combined with --dataset")
+    record_filter = RecordFilter(isins or None, filing_types or None, args.date_from, args.date_to)
+
+    group_by = args.group_by
+    if group_by is None:
+        group_by = "isin" if args.isin_file else "filing_type" if args.filing_type_file else "none"
+    group_by = {"isin": ISIN_FIELD, "filing_type": FILING_TYPE_FIELD}.get(group_by)
+
+    # A single --isin or --filing-type keeps the original result header.
+    single_key = (bool(args.isin) != bool(args.filing_type)) and not (
+        args.isin_file or args.filing_type_file or args.date_from or args.date_to
+    )
+    isin = args.isin if single_key else None
+    filing_type = args.filing_type if single_key else None
+
+    output_format = args.output_format
+    if output_format is None:
+        output_format = "csv" if args.output and args.output.lower().endswith(".csv") else "ndjson"
+
+    if args.dataset:
+        parse_dataset(args.dataset, isin, filing_type, args.columns, record_filter, group_by)
+    else:
+        parse_metadata(args.metadata_file, isin, filing_type, args.output, output_format,
+                       record_filter, group_by, max(1, args.workers), args.count_by)
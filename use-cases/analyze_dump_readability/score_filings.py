@@ -0,0 +1,342 @@
+import argparse
+import hashlib
+import logging
+import os
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+from tqdm import tqdm
+
+# --- Import from another directory ---
+# The scoring logic lives in the calculate_gunning_fog example.
+GUNNING_FOG_UTIL_PATH = Path(__file__).resolve().parent / "../../analysis/calculate_gunning_fog"
+sys.path.append(str(GUNNING_FOG_UTIL_PATH.resolve()))
+from utils import (  # noqa: E402
+    DEFAULT_TOKENIZER,
+    SCORER_VERSION,
+    TOKENIZERS,
+    calculate_gunning_fog_many,
+)
+
+# Configure logging for clear output
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+
+# --- Configuration ---
+# The name of the table created by load_to_sqlite.py.
+TABLE_NAME = "filings_metadata"
+# Table holding one readability result per filing (filing_id = <table>.id).
+RESULTS_TABLE = "readability_scores"
+# Results written per transaction.
+RESULTS_PER_TRANSACTION = 500
+# Files sent to a worker process at a time.
+FILES_PER_TASK = 8
+# Bytes read at a time while hashing a file.
+READ_SIZE = 1 << 20
+
+
+def create_results_table(conn: sqlite3.Connection):
+    """
+    Creates the results table. It is not declared as a foreign key, so it also
+    works when filings_metadata is the view of the compact schema.
+    """
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {RESULTS_TABLE} ("
+        "filing_id INTEGER PRIMARY KEY, "
+        "markdown_filename TEXT, "
+        "file_size INTEGER, "
+        "file_mtime REAL, "
+        "file_sha256 TEXT, "
+        "scorer_version INTEGER, "
+        "tokenizer TEXT, "
+        "gunning_fog_score REAL, "
+        "error TEXT, "
+        "scored_at TEXT)"
+    )
+    conn.commit()
+
+
+def file_sha256(path) -> str:
+    """Returns the SHA-256 hex digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(READ_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def find_work(
+    conn, markdown_dir: Path, table_name: str, filing_types, tokenizer: str, force: bool
+):
+    """
+    Compares the filings with the stored results.
+
+    Filings whose stored score has the current scorer version and tokenizer
+    and the same file size and modification time are skipped without reading
+    the file. Files that were only touched (same size and hash) are re-hashed
+    but not re-scored. Filings that failed last time are always retried.
+
+    Returns:
+        (tasks, stats dict, ids of results whose filing is gone). Each task is
+        (filing_id, filename, path, size, mtime, known hash or None).
+    """
+    stored = {
+        row[0]: row[1:]
+        for row in conn.execute(
+            "SELECT filing_id, file_size, file_mtime, file_sha256, scorer_version, "
+            f"tokenizer, error IS NOT NULL FROM {RESULTS_TABLE}"
+        )
+    }
+    query = (
+        f'SELECT id, markdown_filename FROM "{table_name}" '
+        "WHERE markdown_filename IS NOT NULL"
+    )
+    params = []
+    if filing_types:
+        query += f" AND filing_type_code IN ({', '.join('?' for _ in filing_types)})"
+        params = list(filing_types)
+    filings = conn.execute(query, params).fetchall()
+
+    tasks = []
+    stats = {"filings": len(filings), "unchanged": 0, "missing": 0}
+    for filing_id, filename in filings:
+        path = markdown_dir / filename
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            stats["missing"] += 1
+            continue
+        previous = stored.get(filing_id)
+        known_hash = None
+        if (
+            previous
+            and previous[3] == SCORER_VERSION
+            and previous[4] == tokenizer
+            and not previous[5]
+            and not force
+        ):
+            if previous[0] == stat.st_size and previous[1] == stat.st_mtime:
+                stats["unchanged"] += 1
+                continue
+            if previous[0] == stat.st_size:
+                known_hash = previous[2]
+        tasks.append(
+            (filing_id, filename, str(path), stat.st_size, stat.st_mtime, known_hash)
+        )
+
+    # Results of filings that are no longer in the metadata table. Only
+    # checked for a full run, since a filtered run does not see every filing.
+    stale = []
+    if not filing_types:
+        stale = list(stored.keys() - {filing_id for filing_id, _ in filings})
+    return tasks, stats, stale
+
+
+def update_scores(
+    db_path: Path,
+    markdown_dir: Path,
+    table_name: str = TABLE_NAME,
+    filing_types=None,
+    workers: int = None,
+    force: bool = False,
+    show_progress: bool = True,
+    tokenizer: str = DEFAULT_TOKENIZER,
+) -> dict:
+    """
+    Scores the markdown files of the filings in `table_name` and stores the
+    results in the readability_scores table.
+
+    Only filings without a score, or whose file, scorer version or tokenizer
+    changed, are scored. Results are written in batched transactions as they arrive,
+    so an interrupted run keeps its progress.
+
+    Returns:
+        A dict with the counts 'filings', 'scored', 'rehashed', 'unchanged',
+        'missing', 'errors' and 'removed'.
+
+    Raises:
+        FileNotFoundError: If the database or the markdown directory is missing.
+        sqlite3.Error: If reading or writing the database fails.
+    """
+    if not Path(db_path).exists():
+        raise FileNotFoundError(f"Database not found: {db_path}")
+    if not Path(markdown_dir).is_dir():
+        raise FileNotFoundError(f"Markdown directory not found: {markdown_dir}")
+
+    start_time = time.time()
+    conn = sqlite3.connect(db_path)
+    try:
+        create_results_table(conn)
+        tasks, stats, stale = find_work(
+            conn, Path(markdown_dir), table_name, filing_types, tokenizer, force
+        )
+        stats.update({"scored": 0, "rehashed": 0, "errors": 0, "removed": len(stale)})
+        logging.info(
+            f"{stats['filings']:,} filings: {len(tasks):,} to check, "
+            f"{stats['unchanged']:,} unchanged, {stats['missing']:,} without a file."
+        )
+
+        conn.executemany(
+            f"DELETE FROM {RESULTS_TABLE} WHERE filing_id = ?",
+            [(filing_id,) for filing_id in stale],
+        )
+        conn.commit()
+
+        # Files that were only touched keep their score if the hash matches.
+        to_score = {}
+        for task in tasks:
+            filing_id, _, path, size, mtime, known_hash = task
+            if known_hash is not None:
+                try:
+                    unchanged = file_sha256(path) == known_hash
+                except OSError:
+                    unchanged = False
+                if unchanged:
+                    stats["rehashed"] += 1
+                    conn.execute(
+                        f"UPDATE {RESULTS_TABLE} SET file_size = ?, file_mtime = ? "
+                        "WHERE filing_id = ?",
+                        (size, mtime, filing_id),
+                    )
+                    continue
+            to_score[path] = task
+        conn.commit()
+
+        # The files are read and scored in worker processes. The hash is
+        # taken afterwards, while the file is still in the page cache.
+        pending = []
+        results = calculate_gunning_fog_many(
+            (Path(path) for path in to_score),
+            tokenizer=tokenizer,
+            max_workers=workers,
+            chunk_size=FILES_PER_TASK,
+        )
+        for name, score in tqdm(
+            results, total=len(to_score), desc="Scoring", unit="files",
+            disable=not show_progress,
+        ):
+            filing_id, filename, path, size, mtime, _ = to_score[name]
+            error = None
+            sha256 = None
+            if isinstance(score, Exception):
+                score, error = None, f"{type(score).__name__}: {score}"
+            else:
+                try:
+                    sha256 = file_sha256(path)
+                except OSError as e:
+                    score, error = None, f"{type(e).__name__}: {e}"
+            stats["errors" if error else "scored"] += 1
+            pending.append(
+                (
+                    filing_id, filename, size, mtime, sha256,
+                    SCORER_VERSION, tokenizer, score, error,
+                )
+            )
+            if len(pending) >= RESULTS_PER_TRANSACTION:
+                write_results(conn, pending)
+                pending = []
+        write_results(conn, pending)
+    finally:
+        conn.close()
+
+    logging.info(
+        f"Scored {stats['scored']:,} files ({stats['errors']:,} errors), "
+        f"{stats['rehashed']:,} touched but unchanged, skipped {stats['unchanged']:,}, "
+        f"removed {stats['removed']:,} stale results "
+        f"in {time.time() - start_time:.2f} seconds."
+    )
+    return stats
+
+
+def write_results(conn: sqlite3.Connection, rows: list):
+    """Writes a batch of results (and any pending updates) in one transaction."""
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {RESULTS_TABLE} (filing_id, markdown_filename, "
+        "file_size, file_mtime, file_sha256, scorer_version, tokenizer, "
+        "gunning_fog_score, error, scored_at) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))",
+        rows,
+    )
+    conn.commit()
+
+
+def main():
+    """Main function to parse arguments and update the readability scores."""
+    parser = argparse.ArgumentParser(
+        description="Calculate the Gunning Fog Index of the markdown files of a "
+        "FinancialReports data dump and store it in the SQLite database.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--db-name",
+        type=Path,
+        default="financialreports.db",
+        help="Path to the SQLite database created by load_to_sqlite.py.",
+    )
+    parser.add_argument(
+        "--table-name",
+        type=str,
+        default=TABLE_NAME,
+        help="Name of the metadata table.",
+    )
+    parser.add_argument(
+        "--markdown-dir",
+        type=Path,
+        required=True,
+        help="Directory containing the dump's markdown files.",
+    )
+    parser.add_argument(
+        "--filing-types",
+        nargs="+",
+        help="Only score filings of these types, e.g. 10-K 20-F.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of worker processes (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--tokenizer",
+        choices=sorted(TOKENIZERS),
+        default=DEFAULT_TOKENIZER,
+        help="Sentence and word tokenizer. 'regex' streams each file and needs "
+        "no NLTK data; changing it re-scores every filing.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Re-score every filing, even if its file has not changed.",
+    )
+    parser.add_argument(
+        "--no-progress",
+        action="store_true",
+        help="Do not display a progress bar.",
+    )
+    args = parser.parse_args()
+
+    try:
+        update_scores(
+            args.db_name,
+            args.markdown_dir,
+            args.table_name,
+            args.filing_types,
+            args.workers,
+            args.force,
+            not args.no_progress,
+            args.tokenizer,
+        )
+    except FileNotFoundError as e:
+        logging.error(e)
+        sys.exit(1)
+    except sqlite3.Error as e:
+        logging.error(f"SQLite error while scoring '{args.db_name}': {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+import argparse
+import logging
+import os
+import shutil
+import sqlite3
+import sys
+import time
+from collections import Counter
+from multiprocessing import Pool
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from tqdm import tqdm
+
+# --- Import from another directory ---
+# The keyword matcher lives in the count_keywords example. This is the one
+# import from another example that is not a utils.py (see the README).
+KEYWORD_COUNTER_PATH = Path(__file__).resolve().parent / "../../analysis/count_keywords"
+sys.path.append(str(KEYWORD_COUNTER_PATH.resolve()))
+from keyword_counter import KeywordMatcher  # noqa: E402
+
+# Configure logging for clear output
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s",
+    handlers=[logging.StreamHandler(sys.stdout)],
+)
+
+# --- Configuration ---
+# The name of the table created by load_to_sqlite.py.
+TABLE_NAME = "filings_metadata"
+# Filings whose counts are collected before they are written as one part file.
+# Together with one file per worker in flight, this bounds memory use.
+FILINGS_PER_PART = 5000
+# Files sent to a worker process at a time.
+FILES_PER_TASK = 4
+
+# Schema of the sparse (COO) matrix: one row per non-zero (filing, keyword) cell,
+# with the metadata needed to slice the matrix.
+COUNTS_SCHEMA = pa.schema([
+    ("filing_id", pa.int64()),
+    ("isin", pa.string()),
+    ("filing_type_code", pa.string()),
+    ("release_date", pa.string()),
+    ("keyword_id", pa.int32()),
+    ("count", pa.int32()),
+])
+DONE_SCHEMA = pa.schema([("filing_id", pa.int64())])
+KEYWORDS_SCHEMA = pa.schema([("keyword_id", pa.int32()), ("keyword", pa.string())])
+
+# Set in each worker process by init_worker.
+_matcher = None
+_keyword_ids = None
+
+
+def read_keywords(path: Path) -> list:
+    """
+    Reads a watchlist with one keyword or phrase per line. Blank lines and
+    lines starting with '#' are ignored, as are case-insensitive duplicates.
+    """
+    keywords, seen = [], set()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            keyword = line.strip()
+            if keyword and not keyword.startswith("#") and keyword.lower() not in seen:
+                seen.add(keyword.lower())
+                keywords.append(keyword)
+    return keywords
+
+
+def init_worker(keywords: list):
+    """Builds the keyword automaton once per worker process."""
+    global _matcher, _keyword_ids
+    _matcher = KeywordMatcher(keywords)
+    _keyword_ids = {keyword: i for i, keyword in enumerate(keywords)}
+
+
+def count_file(task: tuple) -> tuple:
+    """
+    Worker: counts the keywords in one markdown file. Any error is returned
+    instead of raised, so one bad file does not stop the run.
+
+    Returns:
+        (filing_id, {keyword_id: count} for the keywords found, error or None).
+    """
+    filing_id, path = task
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            text = f.read()
+        counts = Counter(_keyword_ids[kw] for _, _, kw in _matcher.finditer(text))
+        return filing_id, dict(counts), None
+    except Exception as e:
+        return filing_id, None, f"{type(e).__name__}: {e}"
+
+
+class MatrixWriter:
+    """
+    Writes the matrix as numbered part files. For every part, the count rows
+    are written to `counts/` and then the ids of all filings in the part
+    (including those without matches) to `done/`. A part is complete once its
+    `done/` file exists; each file is written under a temporary name and
+    renamed, so an interrupted run never leaves a half-written file behind.
+    """
+
+    def __init__(self, output_dir: Path, keywords: list, overwrite: bool):
+        self.output_dir = Path(output_dir)
+        self.counts_dir = self.output_dir / "counts"
+        self.done_dir = self.output_dir / "done"
+        keywords_path = self.output_dir / "keywords.parquet"
+
+        if overwrite and self.output_dir.exists():
+            shutil.rmtree(self.output_dir)
+        if keywords_path.exists():
+            stored = pq.read_table(keywords_path).column("keyword").to_pylist()
+            if stored != keywords:
+                logging.error(
+                    f"'{self.output_dir}' was built with a different keyword list. "
+                    "Use --overwrite to start over."
+                )
+                sys.exit(1)
+        self.counts_dir.mkdir(parents=True, exist_ok=True)
+        self.done_dir.mkdir(parents=True, exist_ok=True)
+        if not keywords_path.exists():
+            self._write(
+                pa.table(
+                    {"keyword_id": pa.array(range(len(keywords)), pa.int32()),
+                     "keyword": keywords},
+                    schema=KEYWORDS_SCHEMA,
+                ),
+                keywords_path,
+            )
+
+        # Count files of parts that were interrupted before completion.
+        done_parts = {path.name for path in self.done_dir.glob("part-*.parquet")}
+        for path in self.counts_dir.glob("part-*.parquet"):
+            if path.name not in done_parts:
+                path.unlink()
+        self.next_part = 1 + max(
+            (int(name[len("part-"):-len(".parquet")]) for name in done_parts), default=-1
+        )
+
+    def done_filing_ids(self) -> set:
+        """Returns the ids of the filings in completed parts."""
+        ids = set()
+        for path in self.done_dir.glob("part-*.parquet"):
+            ids.update(pq.read_table(path).column("filing_id").to_pylist())
+        return ids
+
+    @staticmethod
+    def _write(table: pa.Table, path: Path):
+        temp_path = path.with_name(path.name + ".tmp")
+        pq.write_table(table, temp_path, compression="zstd")
+        os.replace(temp_path, path)
+
+    def write_part(self, rows: dict, filing_ids: list):
+        """Writes one part: `rows` maps column names to lists of COO values."""
+        name = f"part-{self.next_part:06d}.parquet"
+        self._write(pa.table(rows, schema=COUNTS_SCHEMA), self.counts_dir / name)
+        self._write(
+            pa.table({"filing_id": filing_ids}, schema=DONE_SCHEMA), self.done_dir / name
+        )
+        self.next_part += 1
+
+
+def build_matrix(
+    db_path: Path,
+    markdown_dir: Path,
+    keywords: list,
+    output_dir: Path,
+    table_name: str = TABLE_NAME,
+    filing_types=None,
+    workers: int = None,
+    overwrite: bool = False,
+    show_progress: bool = True,
+) -> dict:
+    """
+    Counts every keyword in the markdown file of every filing and writes a
+    sparse filings x keywords matrix as Parquet files under `output_dir`.
+
+    Filings in parts completed by an earlier run are skipped, so an
+    interrupted run continues where it stopped.
+
+    Returns:
+        A dict with the counts 'filings', 'done_before', 'processed',
+        'missing', 'errors' and 'cells' (non-zero matrix entries written).
+    """
+    if not Path(db_path).exists():
+        logging.error(f"Database not found: {db_path}")
+        sys.exit(1)
+    if not Path(markdown_dir).is_dir():
+        logging.error(f"Markdown directory not found: {markdown_dir}")
+        sys.exit(1)
+
+    start_time = time.time()
+    writer = MatrixWriter(output_dir, keywords, overwrite)
+    done_ids = writer.done_filing_ids()
+
+    query = (
+        f'SELECT id, markdown_filename, isin, filing_type_code, release_date '
+        f'FROM "{table_name}" WHERE markdown_filename IS NOT NULL'
+    )
+    params = []
+    if filing_types:
+        query += f" AND filing_type_code IN ({', '.join('?' for _ in filing_types)})"
+        params = list(filing_types)
+    conn = sqlite3.connect(db_path)
+    try:
+        filings = conn.execute(query, params).fetchall()
+    except sqlite3.Error as e:
+        logging.error(f"SQLite error while reading '{table_name}': {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+    stats = {"filings": len(filings), "done_before": 0, "processed": 0,
+             "missing": 0, "errors": 0, "cells": 0}
+    metadata, tasks = {}, []
+    for filing_id, filename, isin, filing_type, release_date in filings:
+        if filing_id in done_ids:
+            stats["done_before"] += 1
+            continue
+        path = Path(markdown_dir) / filename
+        if not path.is_file():
+            stats["missing"] += 1
+            continue
+        metadata[filing_id] = (isin, filing_type, release_date)
+        tasks.append((filing_id, str(path)))
+    del done_ids, filings
+    logging.info(
+        f"{stats['filings']:,} filings: {len(tasks):,} to process, "
+        f"{stats['done_before']:,} done in an earlier run, "
+        f"{stats['missing']:,} without a file. {len(keywords):,} keywords."
+    )
+
+    columns = [field.name for field in COUNTS_SCHEMA]
+    rows = {col: [] for col in columns}
+    part_ids = []
+    with Pool(workers or os.cpu_count(), initializer=init_worker, initargs=(keywords,)) as pool:
+        results = pool.imap_unordered(count_file, tasks, chunksize=FILES_PER_TASK)
+        for filing_id, counts, error in tqdm(
+            results, total=len(tasks), desc="Counting", unit="files",
+            disable=not show_progress,
+        ):
+            if error:
+                # Not marked as done, so the filing is retried on the next run.
+                stats["errors"] += 1
+                logging.warning(f"Could not process filing {filing_id}: {error}")
+                continue
+            isin, filing_type, release_date = metadata.pop(filing_id)
+            for keyword_id, count in sorted(counts.items()):
+                rows["filing_id"].append(filing_id)
+                rows["isin"].append(isin)
+                rows["filing_type_code"].append(filing_type)
+                rows["release_date"].append(release_date)
+                rows["keyword_id"].append(keyword_id)
+                rows["count"].append(count)
+            stats["cells"] += len(counts)
+            stats["processed"] += 1
+            part_ids.append(filing_id)
+            if len(part_ids) >= FILINGS_PER_PART:
+                writer.write_part(rows, part_ids)
+                rows = {col: [] for col in columns}
+                part_ids = []
+    if part_ids:
+        writer.write_part(rows, part_ids)
+
+    logging.info(
+        f"Processed {stats['processed']:,} filings ({stats['errors']:,} errors), "
+        f"wrote {stats['cells']:,} non-zero counts to '{output_dir}' "
+        f"in {time.time() - start_time:.2f} seconds."
+    )
+    return stats
+
+
+def main():
+    """Main function to parse arguments and build the keyword matrix."""
+    parser = argparse.ArgumentParser(
+        description="Count a keyword watchlist in every markdown file of a "
+        "FinancialReports data dump and write a sparse filings x keywords "
+        "matrix as Parquet.",
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+    )
+    parser.add_argument(
+        "--db-name",
+        type=Path,
+        default="financialreports.db",
+        help="Path to the SQLite database created by load_to_sqlite.py.",
+    )
+    parser.add_argument(
+        "--table-name",
+        type=str,
+        default=TABLE_NAME,
+        help="Name of the metadata table.",
+    )
+    parser.add_argument(
+        "--markdown-dir",
+        type=Path,
+        required=True,
+        help="Directory containing the dump's markdown files.",
+    )
+    parser.add_argument(
+        "--keywords",
+        type=Path,
+        required=True,
+        help="Text file with one keyword or phrase per line.",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default="keyword_matrix",
+        help="Directory to write the matrix to.",
+    )
+    parser.add_argument(
+        "--filing-types",
+        nargs="+",
+        help="Only process filings of these types, e.g. 10-K 20-F.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of worker processes (default: number of CPUs).",
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Delete an existing matrix in --output-dir and start over.",
+    )
+    parser.add_argument(
+        "--no-progress",
+        action="store_true",
+        help="Do not display a progress bar.",
+    )
+    args = parser.parse_args()
+
+    try:
+        keywords = read_keywords(args.keywords)
+    except OSError as e:
+        logging.error(f"Could not read the keyword list: {e}")
+        sys.exit(1)
+    if not keywords:
+        logging.error(f"No keywords found in '{args.keywords}'.")
+        sys.exit(1)
+
+    build_matrix(
+        args.db_name,
+        args.markdown_dir,
+        keywords,
+        args.output_dir,
+        args.table_name,
+        args.filing_types,
+        args.workers,
+        args.overwrite,
+        not args.no_progress,
+    )
+
+
+if __name__ == "__main__":
+    main()